@@ -1,8 +1,20 @@
+import heapq
+import time
+import asyncio
 import logging
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+import yfinance as yf
+
+from yf_session import SESSION
+from data_sources.global_market import fetch_commodity_data, fetch_global_stock
+from data_sources.turkish_market import fetch_bist_stock, fetch_bist_stock_fallback
+from data_sources.yahoo_chart import fetch_chart_dailies
+
 logger = logging.getLogger(__name__)
 
 # ============================================================
@@ -212,17 +224,14 @@ def analyze_stock(symbol: str, is_commodity=False, detailed=False):
 
         # Determine source
         if is_commodity or "=" in symbol:
-            from data_sources.global_market import fetch_commodity_data
             data = fetch_commodity_data(symbol)
             if data:
                 data['name'] = COMMODITIES_SYMBOLS.get(symbol, data.get('name', symbol))
         elif symbol.endswith('.IS'):
-            from data_sources.turkish_market import fetch_bist_stock, fetch_bist_stock_fallback
             data = fetch_bist_stock(symbol)
             if not data:
                 data = fetch_bist_stock_fallback(symbol)
         else:
-            from data_sources.global_market import fetch_global_stock
             data = fetch_global_stock(symbol)
 
         if not data:
@@ -317,6 +326,86 @@ def analyze_stock(symbol: str, is_commodity=False, detailed=False):
         return None
 
 
+class TwoQueueTTLCache:
+    """
+    Scan-resistant 2Q cache with a per-entry TTL. New keys land in a small
+    probation queue and are promoted to the protected queue on their second
+    hit, so a sweep of one-off symbols (an export, a bulk request) can only
+    evict other one-off symbols, never the hot ones. Not thread-safe.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, probation_ratio: float = 0.25):
+        self.ttl = ttl
+        self.probation_size = max(1, int(maxsize * probation_ratio))
+        self.protected_size = max(1, maxsize - self.probation_size)
+        self._probation: OrderedDict = OrderedDict()
+        self._protected: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        for queue in (self._protected, self._probation):
+            entry = queue.get(key)
+            if entry is None:
+                continue
+            expires, value = entry
+            if expires <= now:
+                del queue[key]
+                return default
+            if queue is self._probation:
+                del self._probation[key]
+                self._protect(key, entry)
+            else:
+                self._protected.move_to_end(key)
+            return value
+        return default
+
+    def __setitem__(self, key, value):
+        entry = (time.monotonic() + self.ttl, value)
+        if key in self._protected:
+            self._protected[key] = entry
+            self._protected.move_to_end(key)
+            return
+        self._probation[key] = entry
+        self._probation.move_to_end(key)
+        while len(self._probation) > self.probation_size:
+            self._probation.popitem(last=False)
+
+    def __len__(self):
+        return len(self._probation) + len(self._protected)
+
+    def _protect(self, key, entry):
+        self._protected[key] = entry
+        if len(self._protected) > self.protected_size:
+            # The coldest protected key gets one more chance in probation
+            old_key, old_entry = self._protected.popitem(last=False)
+            self._probation[old_key] = old_entry
+            while len(self._probation) > self.probation_size:
+                self._probation.popitem(last=False)
+
+
+# Per-symbol analyze_stock results, shared by /api/analyze, the AI endpoint and
+# the exports so one symbol isn't re-fetched several times a minute
+ANALYSIS_CACHE_TTL = 60
+_analysis_cache = TwoQueueTTLCache(maxsize=2048, ttl=ANALYSIS_CACHE_TTL)
+_analysis_lock = threading.Lock()
+
+
+def cached_analyze(symbol: str, is_commodity=False, detailed=False):
+    """analyze_stock() memoized per (symbol, is_commodity, detailed); misses aren't cached."""
+    key = (symbol, is_commodity or "=" in symbol, detailed)
+    with _analysis_lock:
+        data = _analysis_cache.get(key)
+    if data is not None:
+        return data
+
+    # Fetch outside the lock so different symbols don't queue behind each other
+    data = analyze_stock(symbol, *key[1:])
+    if data:
+        with _analysis_lock:
+            _analysis_cache[key] = data
+    return data
+
+
 def get_market_opportunities(cached_data=None):
     """Scan for buy signals from cached data or fetch fresh."""
     opportunities = []
@@ -331,141 +420,174 @@ def get_market_opportunities(cached_data=None):
         for stock in cached_data:
             if isinstance(stock, dict):
                 if stock.get('is_favorable', False) and stock.get('change_pct', 0) > 0.5:
+                    # Copy: cached_data is usually a shared snapshot other requests are serving
                     if not stock.get('reason'):
-                        stock['reason'] = stock.get('prediction', 'Positive Trend')
+                        stock = {**stock, 'reason': stock.get('prediction', 'Positive Trend')}
                     opportunities.append(stock)
 
-    opportunities.sort(key=lambda x: (
+    # Only the top 15 are returned: select them without sorting every candidate
+    return heapq.nlargest(15, opportunities, key=lambda x: (
         x.get('currency', '') == 'TRY' or x.get('market_type', '') == 'BIST' or str(x.get('symbol', '')).endswith('.IS'),
         x.get('change_pct', 0)
-    ), reverse=True)
-    return opportunities[:15]
+    ))
 
 
-def get_bulk_analysis(period: str):
+def _period_summary(symbol: str, hist: pd.DataFrame, currency: str, period: str, days_back: int) -> dict:
     """
-    Bulk analysis for Excel export.
-    Uses yfinance for detailed historical data.
-    Period: 'daily', 'weekly', 'monthly'
+    Export row for one symbol's daily history. Pure pandas with no I/O, so
+    callers can compute rows on worker threads.
     """
-    try:
-        import yfinance as yf
-    except ImportError:
-        logger.error("yfinance not installed")
-        return []
+    df = hist.copy()
+    df['MA_5'] = df['Close'].rolling(window=5).mean()
+    df['MA_20'] = df['Close'].rolling(window=20).mean()
 
-    fetch_period = "6mo"
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    df['RSI'] = 100 - (100 / (1 + rs))
 
-    days_back = 1
-    if period == "daily":
-        days_back = 1
-    elif period == "weekly":
-        days_back = 5
-    elif period == "monthly":
-        days_back = 22
-    else:
-        return []
+    df['Returns'] = df['Close'].pct_change()
+    df['Volatility'] = df['Returns'].rolling(window=20).std() * np.sqrt(252) * 100
 
-    results = []
-    all_symbols = list(BIST_SYMBOLS[:50]) + list(GLOBAL_SYMBOLS[:50]) + list(COMMODITIES_SYMBOLS.keys())
+    current_row = df.iloc[-1]
+    current_close = current_row['Close']
+    current_date = df.index[-1].strftime("%Y-%m-%d")
+
+    lookback_idx = -1 - days_back
+    if abs(lookback_idx) > len(df):
+        lookback_idx = 0
+
+    past_row = df.iloc[lookback_idx]
+    past_close = past_row['Close']
+
+    period_slice = df.iloc[lookback_idx:]
+    period_high = period_slice['High'].max()
+    period_low = period_slice['Low'].min()
+    period_high_date = period_slice['High'].idxmax().strftime("%Y-%m-%d")
+    period_low_date = period_slice['Low'].idxmin().strftime("%Y-%m-%d")
+
+    change_amt = current_close - past_close
+    change_pct = (change_amt / past_close) * 100
+
+    trend_icon = "➖"
+    if change_pct > 0:
+        trend_icon = "📈 UP"
+    elif change_pct < 0:
+        trend_icon = "📉 DOWN"
+
+    rsi_val = current_row.get('RSI', 50)
+    if pd.isna(rsi_val):
+        rsi_val = 50
+    rsi_status = "Neutral"
+    if rsi_val > 70:
+        rsi_status = "Overbought (High Risk)"
+    if rsi_val < 30:
+        rsi_status = "Oversold (Value)"
+
+    vol_val = current_row.get('Volatility', 0)
+    if pd.isna(vol_val):
+        vol_val = 0
+
+    ma20_val = current_row.get('MA_20', 0)
+    if pd.isna(ma20_val):
+        ma20_val = 0
+
+    name = COMMODITIES_SYMBOLS.get(symbol, symbol)
+
+    return {
+        "Symbol": symbol,
+        "Name": name,
+        "Currency": currency,
+        "Report Period": period.capitalize(),
+        "Analysis Date": current_date,
+        "Trend": trend_icon,
+        "Current Price": round(current_close, 2),
+        "Start Price": round(past_close, 2),
+        "Change %": round(change_pct, 2),
+        "Change Amt": round(change_amt, 2),
+        "Period High": round(period_high, 2),
+        "High Date": period_high_date,
+        "Period Low": round(period_low, 2),
+        "Low Date": period_low_date,
+        "RSI (14)": round(rsi_val, 2),
+        "RSI Status": rsi_status,
+        "Volatility %": round(vol_val, 2),
+        "MA(20)": round(ma20_val, 2),
+        "Volume (Period)": int(period_slice['Volume'].sum())
+    }
+
+
+BULK_FETCH_PERIOD = "6mo"
+BULK_DAYS_BACK = {"daily": 1, "weekly": 5, "monthly": 22}
+
+
+def _bulk_symbols() -> list:
+    return list(BIST_SYMBOLS[:50]) + list(GLOBAL_SYMBOLS[:50]) + list(COMMODITIES_SYMBOLS.keys())
+
+
+def _bulk_row(symbol: str, period: str, days_back: int):
+    """One export row from yfinance history; None when there isn't enough data."""
+    try:
+        ticker = yf.Ticker(symbol, session=SESSION)
+        hist = ticker.history(period=BULK_FETCH_PERIOD)
 
-    for symbol in all_symbols:
+        if hist.empty or len(hist) < 30:
+            return None
+
+        # Detect actual currency (EUR for European stocks, GBP for UK, etc.)
+        bulk_currency = "TRY" if symbol.endswith('.IS') else "USD"
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=fetch_period)
+            info = ticker.info
+            bulk_currency = info.get("currency", bulk_currency) or bulk_currency
+        except Exception:
+            pass
 
-            if hist.empty or len(hist) < 30:
-                continue
+        return _period_summary(symbol, hist, bulk_currency, period, days_back)
 
-            # Detect actual currency (EUR for European stocks, GBP for UK, etc.)
-            bulk_currency = "TRY" if symbol.endswith('.IS') else "USD"
-            try:
-                info = ticker.info
-                bulk_currency = info.get("currency", bulk_currency) or bulk_currency
-            except Exception:
-                pass
-
-            df = hist.copy()
-            df['MA_5'] = df['Close'].rolling(window=5).mean()
-            df['MA_20'] = df['Close'].rolling(window=20).mean()
-
-            delta = df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-
-            df['Returns'] = df['Close'].pct_change()
-            df['Volatility'] = df['Returns'].rolling(window=20).std() * np.sqrt(252) * 100
-
-            current_row = df.iloc[-1]
-            current_close = current_row['Close']
-            current_date = df.index[-1].strftime("%Y-%m-%d")
-
-            lookback_idx = -1 - days_back
-            if abs(lookback_idx) > len(df):
-                lookback_idx = 0
-
-            past_row = df.iloc[lookback_idx]
-            past_close = past_row['Close']
-
-            period_slice = df.iloc[lookback_idx:]
-            period_high = period_slice['High'].max()
-            period_low = period_slice['Low'].min()
-            period_high_date = period_slice['High'].idxmax().strftime("%Y-%m-%d")
-            period_low_date = period_slice['Low'].idxmin().strftime("%Y-%m-%d")
-
-            change_amt = current_close - past_close
-            change_pct = (change_amt / past_close) * 100
-
-            trend_icon = "➖"
-            if change_pct > 0:
-                trend_icon = "📈 UP"
-            elif change_pct < 0:
-                trend_icon = "📉 DOWN"
-
-            rsi_val = current_row.get('RSI', 50)
-            if pd.isna(rsi_val):
-                rsi_val = 50
-            rsi_status = "Neutral"
-            if rsi_val > 70:
-                rsi_status = "Overbought (High Risk)"
-            if rsi_val < 30:
-                rsi_status = "Oversold (Value)"
-
-            vol_val = current_row.get('Volatility', 0)
-            if pd.isna(vol_val):
-                vol_val = 0
-
-            ma20_val = current_row.get('MA_20', 0)
-            if pd.isna(ma20_val):
-                ma20_val = 0
-
-            name = COMMODITIES_SYMBOLS.get(symbol, symbol)
-
-            results.append({
-                "Symbol": symbol,
-                "Name": name,
-                "Currency": bulk_currency,
-                "Report Period": period.capitalize(),
-                "Analysis Date": current_date,
-                "Trend": trend_icon,
-                "Current Price": round(current_close, 2),
-                "Start Price": round(past_close, 2),
-                "Change %": round(change_pct, 2),
-                "Change Amt": round(change_amt, 2),
-                "Period High": round(period_high, 2),
-                "High Date": period_high_date,
-                "Period Low": round(period_low, 2),
-                "Low Date": period_low_date,
-                "RSI (14)": round(rsi_val, 2),
-                "RSI Status": rsi_status,
-                "Volatility %": round(vol_val, 2),
-                "MA(20)": round(ma20_val, 2),
-                "Volume (Period)": int(period_slice['Volume'].sum())
-            })
+    except Exception:
+        return None
 
-        except Exception as e:
+
+def _bars_frame(bars: dict) -> pd.DataFrame:
+    """Columnar chart bars as a yfinance-style OHLCV frame indexed by date."""
+    df = pd.DataFrame(bars)
+    df.index = pd.to_datetime(df.pop('time'))
+    return df.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'})
+
+
+def _chart_rows(dailies: dict, period: str, days_back: int) -> dict:
+    """{symbol: export row} for the chart payloads with enough history."""
+    rows = {}
+    for symbol, daily in dailies.items():
+        if len(daily['bars']['time']) < 30:
             continue
+        try:
+            currency = daily['currency'] or ("TRY" if symbol.endswith('.IS') else "USD")
+            rows[symbol] = _period_summary(symbol, _bars_frame(daily['bars']), currency, period, days_back)
+        except Exception as e:
+            logger.warning(f"Bulk row failed for {symbol}: {e}")
+    return rows
+
+
+async def get_bulk_analysis_async(period: str):
+    """
+    Bulk analysis for Excel export.
+    Period: 'daily', 'weekly', 'monthly'
+    Histories are fetched concurrently from Yahoo's chart API; symbols it has
+    nothing for fall back to yfinance on threads. Rows keep symbol order.
+    """
+    days_back = BULK_DAYS_BACK.get(period)
+    if days_back is None:
+        return []
+
+    symbols = _bulk_symbols()
+    dailies = await fetch_chart_dailies(symbols, BULK_FETCH_PERIOD)
+    # Indicator math is CPU-bound pandas; one thread hop for all of it
+    rows = await asyncio.to_thread(_chart_rows, dailies, period, days_back)
+
+    missing = [s for s in symbols if s not in dailies]
+    fallback = await asyncio.gather(*(asyncio.to_thread(_bulk_row, s, period, days_back) for s in missing))
+    rows.update((s, row) for s, row in zip(missing, fallback) if row)
 
-    return results
+    return [rows[s] for s in symbols if s in rows]
@@ -5,12 +5,343 @@ Falls back gracefully when APIs fail or hit rate limits
 """
 
 import os
-import requests
-from typing import Optional, Dict
+import re
+import html
+import hashlib
+import asyncio
+import httpx
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List
 import time
-from datetime import datetime
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from collections import deque, OrderedDict
+from datetime import datetime, timezone
 from bs4 import BeautifulSoup
 
+from yf_session import SESSION
+
+# Provider endpoints
+FINNHUB_QUOTE_URL = "https://finnhub.io/api/v1/quote"
+FINNHUB_CANDLE_URL = "https://finnhub.io/api/v1/stock/candle"
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+POLYGON_PREV_URL = "https://api.polygon.io/v2/aggs/ticker/{symbol}/prev"
+POLYGON_SNAPSHOT_URL = "https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers"
+POLYGON_RANGE_URL = "https://api.polygon.io/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{start}/{end}"
+GOOGLE_FINANCE_URL = "https://www.google.com/finance/quote/{symbol}"
+
+ASYNC_TIMEOUT = httpx.Timeout(5.0)
+# The async router starts the next provider in the chain once the current
+# one has missed or been running this long; the first hit wins
+HEDGE_DELAY = 1.5
+# Status codes retried with exponential backoff (same policy as the old urllib3 Retry)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.3
+RATE_LIMIT_COOLDOWN = 60  # seconds a provider is skipped after a 429
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Google Finance quote page markers, matched directly instead of building a DOM
+GF_PRICE_RE = re.compile(r'<div class="YMlKec fxKbKc"[^>]*>([^<]+)<')
+GF_PRICE_ANY_RE = re.compile(r'<div class="YMlKec(?: [^"]*)?"[^>]*>([^<]+)<')
+GF_NAME_RE = re.compile(r'<div class="zzDege"[^>]*>([^<]+)<')
+
+
+def _parse_google_finance(page: str) -> tuple:
+    """Extract (price_text, name) from a quote page; either may be None"""
+    m = GF_PRICE_RE.search(page) or GF_PRICE_ANY_RE.search(page)
+    if m:
+        name_m = GF_NAME_RE.search(page)
+        name = html.unescape(name_m.group(1)).strip() if name_m else None
+        return html.unescape(m.group(1)), name
+
+    # Markup changed shape: fall back to a full parse
+    soup = BeautifulSoup(page, 'html.parser')
+    price_div = soup.find('div', class_='YMlKec fxKbKc')
+    if not price_div: price_div = soup.find('div', class_='YMlKec')
+    name_div = soup.find('div', class_='zzDege')
+    return (
+        price_div.get_text() if price_div else None,
+        name_div.text.strip() if name_div else None,
+    )
+
+
+def _format_timestamps(seconds, intraday: bool) -> List[str]:
+    """Format epoch seconds as 'YYYY-MM-DD HH:MM' / 'YYYY-MM-DD' in one vectorized pass"""
+    stamps = np.asarray(seconds, dtype='int64').astype('datetime64[s]')
+    if not stamps.size:
+        return []
+    if intraday:
+        return np.char.replace(np.datetime_as_string(stamps, unit='m'), 'T', ' ').tolist()
+    return np.datetime_as_string(stamps, unit='D').tolist()
+
+
+def _parse_finnhub_quote(symbol: str, data: Dict) -> Optional[Dict]:
+    """Convert a Finnhub /quote payload to our price format"""
+    if data.get('c') == 0:
+        return None
+        
+    current_price = data.get('c', 0)
+    prev_close = data.get('pc', current_price)
+    change_pct = ((current_price - prev_close) / prev_close * 100) if prev_close else 0
+    
+    return {
+        'symbol': symbol,
+        'price': round(current_price, 2),
+        'change_pct': round(change_pct, 2),
+        'high': data.get('h', current_price),
+        'low': data.get('l', current_price),
+        'open': data.get('o', current_price),
+        'prev_close': prev_close,
+        'previous_close': prev_close,
+        'day_high': data.get('h', current_price),
+        'day_low': data.get('l', current_price),
+        'timestamp': data.get('t', int(time.time()))
+    }
+
+
+def _parse_alpha_vantage_quote(symbol: str, data: Dict) -> Optional[Dict]:
+    """Convert an Alpha Vantage GLOBAL_QUOTE payload to our price format"""
+    quote = data.get('Global Quote', {})
+    if not quote:
+        return None
+    
+    price = float(quote.get('05. price', 0))
+    change_pct = float(quote.get('10. change percent', '0').replace('%', ''))
+    
+    return {
+        'symbol': symbol,
+        'price': round(price, 2),
+        'change_pct': round(change_pct, 2),
+        'high': float(quote.get('03. high', price)),
+        'low': float(quote.get('04. low', price)),
+        'open': float(quote.get('02. open', price)),
+        'prev_close': float(quote.get('08. previous close', price)),
+        'volume': int(quote.get('06. volume', 0))
+    }
+
+
+def _parse_polygon_prev(symbol: str, data: Dict) -> Optional[Dict]:
+    """Convert a Polygon /prev aggregate payload to our price format"""
+    results = data.get('results', [])
+    if not results: return None
+    
+    quote = results[0]
+    close_price = quote.get('c', 0)
+    open_price = quote.get('o', close_price)
+    change_pct = ((close_price - open_price) / open_price * 100) if open_price else 0
+    
+    return {
+        'symbol': symbol,
+        'price': round(close_price, 2),
+        'change_pct': round(change_pct, 2),
+        'high': quote.get('h', close_price),
+        'low': quote.get('l', close_price),
+        'open': open_price,
+        'volume': quote.get('v', 0)
+    }
+
+
+def _parse_polygon_snapshot(data: Dict) -> Dict[str, Dict]:
+    """Convert a Polygon all-tickers snapshot to {ticker: price dict}"""
+    quotes = {}
+    for item in data.get('tickers') or []:
+        symbol = item.get('ticker')
+        day = item.get('day') or {}
+        prev = item.get('prevDay') or {}
+        # Before the open `day` is all zeros; fall back to the last trade, then prior close
+        close_price = day.get('c') or (item.get('lastTrade') or {}).get('p') or prev.get('c')
+        if not symbol or not close_price:
+            continue
+        quotes[symbol] = {
+            'symbol': symbol,
+            'price': round(close_price, 2),
+            'change_pct': round(item.get('todaysChangePerc') or 0, 2),
+            'high': day.get('h') or close_price,
+            'low': day.get('l') or close_price,
+            'open': day.get('o') or close_price,
+            'volume': day.get('v') or 0,
+            'prev_close': prev.get('c', close_price),
+            'source': 'polygon_snapshot'
+        }
+    return quotes
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: allows bursts up to `capacity` calls and
+    refills at `rate` tokens per second. Thread-safe.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_wait: float = 5.0):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_wait = max_wait
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: int) -> Optional[float]:
+        """Take n tokens, returning how long the caller must wait (None = too long)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+            delta = self.tokens - n
+            if delta >= 0:
+                self.tokens = delta
+                return 0.0
+
+            wait = -delta / self.rate
+            if wait > self.max_wait:
+                return None
+            self.tokens = delta  # Reserve the tokens we are about to wait for
+            return wait
+
+    def try_acquire(self, n: int = 1) -> bool:
+        """Block until n tokens are available; False if that would exceed max_wait"""
+        wait = self._reserve(n)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, n: int = 1) -> bool:
+        """Like try_acquire, but yields to the event loop while waiting"""
+        wait = self._reserve(n)
+        if wait is None:
+            return False
+        if wait:
+            await asyncio.sleep(wait)
+        return True
+
+    def penalize(self, seconds: float):
+        """Empty the bucket so no call is admitted for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.last_refill = time.monotonic()
+
+
+def _default_buckets() -> Dict[str, TokenBucket]:
+    """Per-provider limits matching each free tier"""
+    return {
+        'finnhub': TokenBucket(60, 1.0),             # 60/min
+        'alpha_vantage': TokenBucket(5, 25 / 86400),  # 25/day
+        'polygon': TokenBucket(5, 5 / 60),            # 5/min
+        'google': TokenBucket(10, 1.0),
+    }
+
+
+class SlidingWindowCounter:
+    """
+    Tracks absolute provider quotas (e.g. 25/day) so calls that would
+    return 429 are never sent. Thread-safe.
+    """
+
+    def __init__(self, window_seconds: float, limit: int):
+        self.window_seconds = window_seconds
+        self.limit = limit
+        self.calls = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Record a call and return True if it fits in the current window"""
+        with self._lock:
+            now = time.monotonic()
+            cutoff = now - self.window_seconds
+            while self.calls and self.calls[0] <= cutoff:
+                self.calls.popleft()
+            if len(self.calls) >= self.limit:
+                return False
+            self.calls.append(now)
+            return True
+
+    def release(self):
+        """Give back the slot taken by the last allow() (the call was never sent)"""
+        with self._lock:
+            if self.calls:
+                self.calls.pop()
+
+
+def _default_windows() -> Dict[str, SlidingWindowCounter]:
+    """Hard per-provider quotas"""
+    return {
+        'finnhub': SlidingWindowCounter(60, 60),
+        'alpha_vantage': SlidingWindowCounter(86400, 25),
+        'polygon': SlidingWindowCounter(60, 5),
+    }
+
+
+class ExpiringLRU:
+    """
+    Small thread-safe LRU cache whose entries expire after a per-entry TTL.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[object, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Cache lifetimes: quotes go stale quickly, long-range candles barely move
+PRICE_TTL = 30
+HISTORY_TTL = {'1d': 60, '1wk': 300, '1mo': 3600, '1y': 21600, '5y': 86400}
+# One all-tickers Polygon snapshot serves every US lookup for this long
+SNAPSHOT_TTL = 30
+# Price providers per symbol class, in priority order. BIST symbols skip
+# Polygon and Alpha Vantage, which only cover US listings.
+BIST_PROVIDERS = ('scraper', 'finnhub')
+GLOBAL_PROVIDERS = ('scraper', 'finnhub', 'polygon', 'alpha_vantage')
+BIST_HISTORY_PROVIDERS = ('finnhub',)
+GLOBAL_HISTORY_PROVIDERS = ('finnhub', 'polygon')
+# API-key providers, for callers that have already tried yfinance/Google
+KEYED_PROVIDERS = ('finnhub', 'polygon', 'alpha_vantage')
+
+
+def _provider_chain(symbol: str) -> tuple:
+    return BIST_PROVIDERS if symbol.endswith('.IS') else GLOBAL_PROVIDERS
+
+
+def _history_chain(symbol: str) -> tuple:
+    return BIST_HISTORY_PROVIDERS if symbol.endswith('.IS') else GLOBAL_HISTORY_PROVIDERS
+
+
+# period -> (lookback seconds, Finnhub resolution, Polygon multiplier, Polygon timespan)
+# Finnhub supports resolutions 1, 5, 15, 30, 60, D, W, M
+PERIOD_SPEC = {
+    '1d': (24 * 3600, '15', 15, 'minute'),
+    '1wk': (7 * 24 * 3600, '60', 1, 'hour'),
+    '1mo': (30 * 24 * 3600, 'D', 1, 'day'),
+    '1y': (365 * 24 * 3600, 'D', 1, 'day'),  # Daily is best for 1y to avoid limits
+    '5y': (5 * 365 * 24 * 3600, 'W', 1, 'week'),
+}
+# How long validators for conditional history requests are kept
+ETAG_TTL = 86400
+
 
 class StockAPIRouter:
     def __init__(self):
@@ -19,27 +350,81 @@ class StockAPIRouter:
         self.alphavantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.polygon_key = os.getenv('POLYGON_API_KEY')
         
-        # Rate limiting dictionary
-        self.last_call = {}
-        # Finnhub limit is 60/min. 1.2s interval = 50/min (Safe). 
-        # Polygon free is 5/min. If we hit fallback, we MUST wait.
-        self.min_interval = 1.3  
+        # Per-provider token buckets. Idle time builds up burst budget, and a
+        # provider is skipped instead of slept on when its budget is exhausted.
+        self.buckets = _default_buckets()
+        # Quota windows: skip a provider outright once its quota is spent
+        self.windows = _default_windows()
+
+        # Memoized results so repeat lookups don't re-hit remote APIs
+        self._price_cache = ExpiringLRU()
+        self._history_cache = ExpiringLRU()
+        # (etag, body digest, parsed payload) per history request
+        self._etag_cache = ExpiringLRU(maxsize=1024)
+        # Latest Polygon all-tickers snapshot; the lock keeps worker threads
+        # from each spending a Polygon call on the same refresh
+        self._snapshot_cache = ExpiringLRU(maxsize=1)
+        self._snapshot_lock = threading.Lock()
+        # Set on a 401/403: the plan has no snapshot access, so stop asking
+        self._snapshot_denied = False
+
+        # Provider name -> fetcher, walked in _provider_chain / _history_chain order
+        self._fetchers = {
+            'scraper': self.fetch_scraped_data,
+            'finnhub': self.fetch_from_finnhub,
+            'polygon': self.fetch_from_polygon,
+            'alpha_vantage': self.fetch_from_alpha_vantage,
+        }
+        self._history_fetchers = {
+            'finnhub': self._history_from_finnhub,
+            'polygon': self._history_from_polygon,
+        }
+
+        # Shared HTTP/2 client: concurrent requests to the same provider are
+        # multiplexed over one TLS connection instead of one socket per thread.
+        self.session = httpx.Client(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(10.0),
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=2,  # Connection-level retries
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            ),
+        )
         
-    def _rate_limit(self, api_name: str):
-        """Strict rate limiting with sleep"""
-        now = time.time()
-        if api_name in self.last_call:
-            elapsed = now - self.last_call[api_name]
-            if elapsed < self.min_interval:
-                time.sleep(self.min_interval - elapsed)
-        self.last_call[api_name] = time.time()
+    def _get(self, url: str, provider: str, **kwargs) -> httpx.Response:
+        """
+        GET with backoff retries on 429/5xx; the final response is returned as-is.
+        The caller admits the first attempt; each retry is charged to
+        `provider`'s limiters too, and the last response is returned if they refuse.
+        """
+        for attempt in range(RETRY_TOTAL + 1):
+            response = self.session.get(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == RETRY_TOTAL:
+                return response
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+            if not self._admit(provider):
+                return response
+
+    def _admit(self, provider: str) -> bool:
+        """Take a quota slot (if the provider has one) and a token; the slot is returned if the bucket refuses"""
+        window = self.windows.get(provider)
+        if window is not None and not window.allow():
+            return False
+        if not self.buckets[provider].try_acquire():
+            if window is not None:
+                window.release()
+            return False
+        return True
 
     def _handle_api_error(self, e, api_name: str):
         """Handle 429 and other errors"""
-        if isinstance(e, requests.exceptions.HTTPError):
+        if isinstance(e, httpx.HTTPStatusError):
             if e.response.status_code == 429:
-                print(f"⚠️ {api_name} Rate Limit Hit (429). Cooling down for 60s...")
-                time.sleep(60) # Wait for limit reset
+                # Don't block this thread; the provider is skipped until its bucket refills
+                print(f"⚠️ {api_name} Rate Limit Hit (429). Cooling down for {RATE_LIMIT_COOLDOWN}s...")
+                self.buckets[api_name].penalize(RATE_LIMIT_COOLDOWN)
                 return True
         return False
 
@@ -50,43 +435,25 @@ class StockAPIRouter:
         """
         if not self.finnhub_key:
             return None
-            
+        if not self._admit('finnhub'):
+            return None
+
         try:
-            self._rate_limit('finnhub')
             
             # Remove .IS suffix for Turkish stocks - Finnhub uses different format
             clean_symbol = symbol.replace('.IS', '.IST') 
             
-            url = f"https://finnhub.io/api/v1/quote"
+            url = FINNHUB_QUOTE_URL
             params = {'symbol': clean_symbol, 'token': self.finnhub_key}
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._get(url, 'finnhub', params=params, timeout=10)
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get('c') == 0:
-                return None
-                
-            current_price = data.get('c', 0)
-            prev_close = data.get('pc', current_price)
-            change_pct = ((current_price - prev_close) / prev_close * 100) if prev_close else 0
+            data = orjson.loads(response.content)
             
-            return {
-                'symbol': symbol,
-                'price': round(current_price, 2),
-                'change_pct': round(change_pct, 2),
-                'high': data.get('h', current_price),
-                'low': data.get('l', current_price),
-                'open': data.get('o', current_price),
-                'prev_close': prev_close,
-                'previous_close': prev_close,
-                'day_high': data.get('h', current_price),
-                'day_low': data.get('l', current_price),
-                'timestamp': data.get('t', int(time.time()))
-            }
+            return _parse_finnhub_quote(symbol, data)
             
-        except requests.exceptions.HTTPError as e:
-            if self._handle_api_error(e, 'finnhub'): # Calls sleep(60) if 429
+        except httpx.HTTPStatusError as e:
+            if self._handle_api_error(e, 'finnhub'): # Starts a cooldown if 429
                 return None
             print(f"Finnhub HTTP error for {symbol}: {e}")
             return None
@@ -99,44 +466,26 @@ class StockAPIRouter:
         Fetch from Alpha Vantage (25 requests/day free - USE SPARINGLY)
         Best for: Daily data when Finnhub fails
         """
-        if not self.alphavantage_key:
+        # Alpha Vantage doesn't support Turkish stocks well
+        if not self.alphavantage_key or symbol.endswith('.IS'):
             return None
-            
+        if not self._admit('alpha_vantage'):
+            return None
+
         try:
-            self._rate_limit('alpha_vantage')
-            
-            # Alpha Vantage doesn't support Turkish stocks well
-            if symbol.endswith('.IS'):
-                return None
             
-            url = "https://www.alphavantage.co/query"
+            url = ALPHA_VANTAGE_URL
             params = {
                 'function': 'GLOBAL_QUOTE',
                 'symbol': symbol,
                 'apikey': self.alphavantage_key
             }
             
-            response = requests.get(url, params=params, timeout=5)
+            response = self._get(url, 'alpha_vantage', params=params, timeout=5)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
-            quote = data.get('Global Quote', {})
-            if not quote:
-                return None
-            
-            price = float(quote.get('05. price', 0))
-            change_pct = float(quote.get('10. change percent', '0').replace('%', ''))
-            
-            return {
-                'symbol': symbol,
-                'price': round(price, 2),
-                'change_pct': round(change_pct, 2),
-                'high': float(quote.get('03. high', price)),
-                'low': float(quote.get('04. low', price)),
-                'open': float(quote.get('02. open', price)),
-                'prev_close': float(quote.get('08. previous close', price)),
-                'volume': int(quote.get('06. volume', 0))
-            }
+            return _parse_alpha_vantage_quote(symbol, data)
             
         except Exception as e:
             print(f"Alpha Vantage error for {symbol}: {e}")
@@ -147,39 +496,30 @@ class StockAPIRouter:
         Fetch from Polygon.io (5 calls/min free)
         With Strict 429 Error Handling
         """
-        if not self.polygon_key:
+        if not self.polygon_key or symbol.endswith('.IS'):
             return None
-            
+
+        # fetch_prices requests the all-tickers snapshot for batches; a single
+        # lookup only reuses it while fresh, then falls back to /prev
+        quote = (self._snapshot_cache.get('us') or {}).get(symbol)
+        if quote:
+            return quote
+
+        if not self._admit('polygon'):
+            return None
+
         try:
-            self._rate_limit('polygon')
-            if symbol.endswith('.IS'): return None
             
-            url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/prev"
+            url = POLYGON_PREV_URL.format(symbol=symbol)
             params = {'apiKey': self.polygon_key}
             
-            response = requests.get(url, params=params, timeout=5)
+            response = self._get(url, 'polygon', params=params, timeout=5)
             response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', [])
-            if not results: return None
+            data = orjson.loads(response.content)
             
-            quote = results[0]
-            close_price = quote.get('c', 0)
-            open_price = quote.get('o', close_price)
-            change_pct = ((close_price - open_price) / open_price * 100) if open_price else 0
-            
-            return {
-                'symbol': symbol,
-                'price': round(close_price, 2),
-                'change_pct': round(change_pct, 2),
-                'high': quote.get('h', close_price),
-                'low': quote.get('l', close_price),
-                'open': open_price,
-                'volume': quote.get('v', 0)
-            }
-        except requests.exceptions.HTTPError as e:
-            if self._handle_api_error(e, 'polygon'): # Calls sleep(60) if 429
+            return _parse_polygon_prev(symbol, data)
+        except httpx.HTTPStatusError as e:
+            if self._handle_api_error(e, 'polygon'): # Starts a cooldown if 429
                 return None
             print(f"Polygon HTTP error for {symbol}: {e}")
             return None
@@ -187,6 +527,45 @@ class StockAPIRouter:
             print(f"Polygon error for {symbol}: {e}")
             return None
     
+    def fetch_polygon_snapshot_all(self) -> Dict[str, Dict]:
+        """
+        Fetch quotes for all US tickers in one Polygon snapshot call, cached
+        for SNAPSHOT_TTL seconds. Returns {} without a key or when the call
+        fails; the empty result is cached too so a failing plan isn't retried
+        on every lookup, and a 401/403 (no snapshot access on this plan)
+        disables the snapshot for the life of the process.
+        """
+        if not self.polygon_key or self._snapshot_denied:
+            return {}
+
+        quotes = self._snapshot_cache.get('us')
+        if quotes is not None:
+            return quotes
+
+        with self._snapshot_lock:
+            quotes = self._snapshot_cache.get('us')
+            if quotes is not None:
+                return quotes
+            if not self._admit('polygon'):
+                return {}
+
+            quotes = {}
+            try:
+                response = self._get(POLYGON_SNAPSHOT_URL, 'polygon', params={'apiKey': self.polygon_key}, timeout=10)
+                response.raise_for_status()
+                quotes = _parse_polygon_snapshot(orjson.loads(response.content))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in (401, 403):
+                    print(f"Polygon snapshot not available on this plan ({e.response.status_code}); using /prev only")
+                    self._snapshot_denied = True
+                elif not self._handle_api_error(e, 'polygon'):
+                    print(f"Polygon snapshot HTTP error: {e}")
+            except Exception as e:
+                print(f"Polygon snapshot error: {e}")
+
+            self._snapshot_cache.set('us', quotes, SNAPSHOT_TTL)
+            return quotes
+
     def fetch_scraped_data(self, symbol: str) -> Optional[Dict]:
         """
         Primary Data Source:
@@ -195,8 +574,7 @@ class StockAPIRouter:
         """
         # 1. Try yfinance library
         try:
-            import yfinance as yf
-            ticker = yf.Ticker(symbol)
+            ticker = yf.Ticker(symbol, session=SESSION)
             
             # fast_info is reliable for price/vol
             info = ticker.fast_info
@@ -248,20 +626,18 @@ class StockAPIRouter:
             gf_symbol = f"NASDAQ:{symbol}"
         
         try:
-            url = f"https://www.google.com/finance/quote/{gf_symbol}"
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+            if not self._admit('google'):
+                return None
+
+            url = GOOGLE_FINANCE_URL.format(symbol=gf_symbol)
             
-            response = requests.get(url, headers=headers, timeout=5)
+            response = self._get(url, 'google', timeout=5)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                price_div = soup.find('div', class_='YMlKec fxKbKc')
-                if not price_div: price_div = soup.find('div', class_='YMlKec')
+                price_text, name = _parse_google_finance(response.text)
+                name = name or symbol
                 
-                name_div = soup.find('div', class_='zzDege')
-                name = name_div.text.strip() if name_div else symbol
-                
-                if price_div:
-                    p_text = price_div.get_text().replace('₺', '').replace('$', '').replace(',', '').strip()
+                if price_text:
+                    p_text = price_text.replace('₺', '').replace('$', '').replace(',', '').strip()
                     price = float(p_text)
                     
                     # STRICT Sanity check for BIST
@@ -283,163 +659,463 @@ class StockAPIRouter:
             
         return None
 
-    def fetch_price(self, symbol: str) -> Optional[Dict]:
+    def fetch_price(self, symbol: str, force_refresh: bool = False) -> Optional[Dict]:
         """
-        Fetch current price data.
+        Fetch current price data, served from a 30s cache unless force_refresh.
         Priority: Scraper (yfinance/Google) -> Finnhub -> Polygon -> Alpha Vantage
         """
-        # 1. Scraping (Unlimited, Primary)
-        data = self.fetch_scraped_data(symbol)
-        if data: return data
+        if not force_refresh:
+            cached = self._price_cache.get(symbol)
+            if cached:
+                return cached
 
-        # 2. Finnhub (API, 60/min)
-        data = self.fetch_from_finnhub(symbol)
-        if data: return data
-        
-        # 3. Polygon (API, 5/min)
-        data = self.fetch_from_polygon(symbol)
-        if data: return data
-        
-        # 4. Alpha Vantage (Backup)
-        data = self.fetch_from_alpha_vantage(symbol)
-        if data: return data
-        
+        data = self._fetch_price_uncached(symbol)
+        if data:
+            self._price_cache.set(symbol, data, PRICE_TTL)
+        return data
+
+    def _fetch_price_uncached(self, symbol: str) -> Optional[Dict]:
+        for provider in _provider_chain(symbol):
+            data = self._fetchers[provider](symbol)
+            if data: return data
         return None
 
-    def fetch_history(self, symbol: str, period: str = "1mo") -> Optional[Dict]:
+    def fetch_bist_snapshot(self, symbols: List[str]) -> set:
         """
-        Fetch historical candle data for charts.
+        Fetch quotes for many BIST symbols in one batched yfinance download
+        and seed the price cache with them, instead of scraping one Google
+        Finance page per symbol. Returns the symbols that were cached.
+        """
+        try:
+            df = yf.download(
+                tickers=" ".join(symbols), period="5d", interval="1d",
+                group_by="ticker", threads=True, progress=False, session=SESSION,
+            )
+        except Exception as e:
+            print(f"BIST snapshot error: {e}")
+            return set()
+
+        if df is None or df.empty:
+            return set()
+
+        seeded = set()
+        for symbol in symbols:
+            try:
+                bars = df[symbol] if isinstance(df.columns, pd.MultiIndex) else df
+                bars = bars.dropna(subset=['Close'])
+                if bars.empty:
+                    continue
+
+                last = bars.iloc[-1]
+                price = float(last['Close'])
+                # Same 49k index-scraping guard as fetch_scraped_data
+                if price <= 0 or price > 20000:
+                    continue
+                prev_close = float(bars['Close'].iloc[-2]) if len(bars) > 1 else price
+                change_pct = ((price - prev_close) / prev_close) * 100 if prev_close else 0
+
+                self._price_cache.set(symbol, {
+                    "symbol": symbol,
+                    "name": symbol,
+                    "price": round(price, 2),
+                    "change_pct": round(change_pct, 2),
+                    "volume": 0 if pd.isna(last['Volume']) else int(last['Volume']),
+                    "high": round(float(last['High']), 2),
+                    "low": round(float(last['Low']), 2),
+                    "open": round(float(last['Open']), 2),
+                    "source": "yfinance_snapshot"
+                }, PRICE_TTL)
+                seeded.add(symbol)
+            except Exception:
+                continue
+
+        return seeded
+
+    def fetch_prices(self, symbols: List[str], max_workers: int = 8,
+                     force_refresh: bool = False) -> Dict[str, Dict]:
+        """
+        Fetch current price data for many symbols concurrently.
+        BIST symbols are hydrated first from one bulk yfinance download and US
+        symbols from one Polygon snapshot; everything still missing runs the normal fetch_price fallback chain on a worker
+        thread. Symbols with no data are left out of the result.
+        """
+        if not symbols:
+            return {}
+
+        bist_missing = [
+            s for s in symbols
+            if s.endswith('.IS') and (force_refresh or self._price_cache.get(s) is None)
+        ]
+        # Symbols the BIST snapshot just refreshed; don't force them again below
+        snapshot_fresh = self.fetch_bist_snapshot(bist_missing) if len(bist_missing) > 1 else set()
+
+        us_missing = [
+            s for s in symbols
+            if not s.endswith('.IS') and (force_refresh or self._price_cache.get(s) is None)
+        ]
+        if self.polygon_key and len(us_missing) > 1:
+            snapshot = self.fetch_polygon_snapshot_all()
+            for symbol in us_missing:
+                quote = snapshot.get(symbol)
+                if quote:
+                    self._price_cache.set(symbol, quote, PRICE_TTL)
+
+        workers = min(max_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = executor.map(lambda s: self.fetch_price(s, force_refresh and s not in snapshot_fresh), symbols)
+            return {symbol: data for symbol, data in zip(symbols, fetched) if data}
+
+    def fetch_history(self, symbol: str, period: str = "1mo", force_refresh: bool = False) -> Optional[Dict]:
+        """
+        Fetch historical candle data for charts as columnar arrays:
+        {"symbol": ..., "history": {"time": [...], "open": [...], ...}}.
+        Cached per (symbol, period) for HISTORY_TTL seconds unless force_refresh.
         Priority: Finnhub -> Polygon -> Alpha Vantage
         """
-        # Convert period to timestamps (start/end)
+        key = (symbol, period)
+        if not force_refresh:
+            cached = self._history_cache.get(key)
+            if cached:
+                return cached
+
+        data = self._fetch_history_uncached(symbol, period)
+        if data:
+            self._history_cache.set(key, data, HISTORY_TTL.get(period, 3600))
+        return data
+
+    def _get_json_conditional(self, url: str, provider: str, params: Dict, key) -> tuple:
+        """
+        GET a JSON payload with If-None-Match revalidation.
+        Returns (response, data); data is None for non-200 responses.
+        A 304, or a 200 whose body hash is unchanged (providers without
+        ETags), reuses the previously parsed payload.
+        """
+        cached = self._etag_cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached and cached[0] else None
+
+        response = self._get(url, provider, params=params, headers=headers, timeout=10)
+        if response.status_code == 304 and cached:
+            return response, cached[2]
+        if response.status_code != 200:
+            return response, None
+
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if cached and cached[1] == digest:
+            return response, cached[2]
+
+        data = orjson.loads(response.content)
+        self._etag_cache.set(key, (response.headers.get('ETag'), digest, data), ETAG_TTL)
+        return response, data
+
+    def _fetch_history_uncached(self, symbol: str, period: str) -> Optional[Dict]:
+        lookback, fh_res, multiplier, timespan = PERIOD_SPEC.get(period, PERIOD_SPEC['1mo'])
         end_ts = int(time.time())
-        start_ts = end_ts - (30 * 24 * 3600) # Default 1mo
-        resolution = "D"
-        
-        if period == "1d":
-            start_ts = end_ts - (24 * 3600)
-            resolution = "15" # 15 min
-        elif period == "1wk":
-            start_ts = end_ts - (7 * 24 * 3600)
-            resolution = "60"
-        elif period == "1mo":
-            start_ts = end_ts - (30 * 24 * 3600)
-            resolution = "D" 
-        elif period == "1y":
-            start_ts = end_ts - (365 * 24 * 3600)
-            resolution = "D" # Daily is best for 1y to avoid limits
-        elif period == "5y":
-            start_ts = end_ts - (5 * 365 * 24 * 3600)
-            resolution = "W" # Weekly
+        spec = {
+            'start_ts': end_ts - lookback,
+            'end_ts': end_ts,
+            'fh_res': fh_res,
+            'multiplier': multiplier,
+            'timespan': timespan,
+            'intraday': timespan in ('minute', 'hour'),
+        }
+
+        for provider in _history_chain(symbol):
+            data = self._history_fetchers[provider](symbol, spec)
+            if data: return data
+        return None
+
+    def _history_from_finnhub(self, symbol: str, spec: Dict) -> Optional[Dict]:
+        """Finnhub candles (best for candles, covers BIST via .IST)"""
+        if not (self.finnhub_key and self._admit('finnhub')):
+            return None
+        try:
+            clean_symbol = symbol.replace('.IS', '.IST')
             
-        # Try Finnhub (Best for candles)
-        if self.finnhub_key:
-            try:
-                self._rate_limit('finnhub')
-                clean_symbol = symbol.replace('.IS', '.IST')
-                
-                # Finnhub resolution mapping
-                # Supported: 1, 5, 15, 30, 60, D, W, M
-                fh_res = resolution
-                if resolution == "15": fh_res = "15"
-                if resolution == "60": fh_res = "60"
-                if resolution == "W": fh_res = "W"
-                
-                url = "https://finnhub.io/api/v1/stock/candle"
-                params = {
-                    'symbol': clean_symbol,
-                    'resolution': fh_res,
-                    'from': start_ts,
-                    'to': end_ts,
-                    'token': self.finnhub_key
+            url = FINNHUB_CANDLE_URL
+            params = {
+                'symbol': clean_symbol,
+                'resolution': spec['fh_res'],
+                'from': spec['start_ts'],
+                'to': spec['end_ts'],
+                'token': self.finnhub_key
+            }
+            
+            # The from/to window moves every call, so revalidate per symbol+resolution
+            response, data = self._get_json_conditional(url, 'finnhub', params, (url, clean_symbol, spec['fh_res']))
+            if response.status_code == 429:
+                print(f"Finnhub History 429 for {symbol}")
+                return None
+            if data and data.get('s') == 'ok':
+                # Columnar (one list per field) rather than one dict per bar
+                history = {
+                    "time": _format_timestamps(data.get('t', []), spec['intraday']),
+                    "open": data.get('o', []),
+                    "high": data.get('h', []),
+                    "low": data.get('l', []),
+                    "close": data.get('c', []),
                 }
+                return {"symbol": symbol, "history": history}
                 
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code == 429:
-                     print(f"Finnhub History 429 for {symbol}")
-                     # Fallthrough
-                else:
-                    data = response.json()
-                    
-                    if data.get('s') == 'ok':
-                        # Convert to our format
-                        history = []
-                        times = data.get('t', [])
-                        opens = data.get('o', [])
-                        highs = data.get('h', [])
-                        lows = data.get('l', [])
-                        closes = data.get('c', [])
-                        
-                        for i in range(len(times)):
-                            ts = datetime.fromtimestamp(times[i])
-                            time_str = ts.strftime("%Y-%m-%d %H:%M") if "m" in period or period=="1d" else ts.strftime("%Y-%m-%d")
-                            history.append({
-                                "time": time_str,
-                                "open": opens[i],
-                                "high": highs[i],
-                                "low": lows[i],
-                                "close": closes[i]
-                            })
-                        return {"symbol": symbol, "history": history}
-                    
-            except Exception as e:
-                print(f"Finnhub history error: {e}")
+        except Exception as e:
+            print(f"Finnhub history error: {e}")
+        return None
 
-        # Try Polygon (US only)
-        if self.polygon_key and not symbol.endswith(".IS"):
-            try:
-                self._rate_limit('polygon')
-                multiplier = 1
-                timespan = "day"
-                
-                if period == "1d": 
-                    timespan = "minute"
-                    multiplier = 15
-                elif period == "1y":
-                    timespan = "day"
-                elif period == "5y":
-                    timespan = "week"
-                    
-                start_date = datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d")
-                end_date = datetime.fromtimestamp(end_ts).strftime("%Y-%m-%d")
-                
-                url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{start_date}/{end_date}"
-                params = {'apiKey': self.polygon_key, 'limit': 500}
-                
-                response = requests.get(url, params=params, timeout=10)
+    def _history_from_polygon(self, symbol: str, spec: Dict) -> Optional[Dict]:
+        """Polygon aggregates (US only)"""
+        if not (self.polygon_key and self._admit('polygon')):
+            return None
+        try:
+            start_date = datetime.fromtimestamp(spec['start_ts'], tz=timezone.utc).strftime("%Y-%m-%d")
+            end_date = datetime.fromtimestamp(spec['end_ts'], tz=timezone.utc).strftime("%Y-%m-%d")
+            
+            url = POLYGON_RANGE_URL.format(
+                symbol=symbol, multiplier=spec['multiplier'], timespan=spec['timespan'],
+                start=start_date, end=end_date,
+            )
+            params = {'apiKey': self.polygon_key, 'limit': 500}
+            
+            response, data = self._get_json_conditional(url, 'polygon', params, url)
+            if response.status_code == 429:
+                print(f"Polygon History 429 for {symbol}")
+                return None
+            if data and data.get('results'):
+                times, opens, highs, lows, closes = [], [], [], [], []
+                for bar in data['results']:
+                    times.append(bar['t'] // 1000)
+                    opens.append(bar.get('o'))
+                    highs.append(bar.get('h'))
+                    lows.append(bar.get('l'))
+                    closes.append(bar.get('c'))
+                history = {
+                    "time": _format_timestamps(times, spec['intraday']),
+                    "open": opens,
+                    "high": highs,
+                    "low": lows,
+                    "close": closes,
+                }
+                return {"symbol": symbol, "history": history}
                 
-                if response.status_code == 429:
-                    print(f"Polygon History 429 for {symbol}")
-                    # Fallthrough
-                else:
-                    data = response.json()
-                    
-                    if data.get('results'):
-                        history = []
-                        for bar in data['results']:
-                            ts = datetime.fromtimestamp(bar['t'] / 1000)
-                            time_str = ts.strftime("%Y-%m-%d %H:%M") if period=="1d" else ts.strftime("%Y-%m-%d")
-                            history.append({
-                                "time": time_str,
-                                "open": bar.get('o'),
-                                "high": bar.get('h'),
-                                "low": bar.get('l'),
-                                "close": bar.get('c')
-                            })
-                        return {"symbol": symbol, "history": history}
-                    
-            except Exception as e:
-                print(f"Polygon history error: {e}")
-
+        except Exception as e:
+            print(f"Polygon history error: {e}")
         return None
 
 
+class AsyncStockAPIRouter:
+    """
+    asyncio variant of StockAPIRouter for use inside the FastAPI event loop.
+    Provider calls share one HTTP/2 httpx.AsyncClient and never block the loop;
+    the yfinance/Google scraper still runs on a worker thread. Limiters and
+    the price cache are the sync router's, so the two together stay within
+    each provider's quota.
+    """
+
+    def __init__(self):
+        self.finnhub_key = os.getenv('FINNHUB_API_KEY')
+        self.alphavantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+        self.polygon_key = os.getenv('POLYGON_API_KEY')
+
+        self._sync = get_router()
+        self.buckets = self._sync.buckets
+        self.windows = self._sync.windows
+        self._price_cache = self._sync._price_cache
+        self._http: Optional[httpx.AsyncClient] = None
+
+        self._fetchers = {
+            'scraper': self.fetch_scraped_data,
+            'finnhub': self.fetch_from_finnhub,
+            'polygon': self.fetch_from_polygon,
+            'alpha_vantage': self.fetch_from_alpha_vantage,
+        }
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """Lazily create the shared client (must happen inside a running loop)"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                headers={'User-Agent': USER_AGENT},
+                timeout=ASYNC_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._http
+
+    async def close(self):
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
+    async def _admit(self, provider: str) -> bool:
+        """Take a quota slot and a token; the slot is returned if the bucket refuses"""
+        if not self.windows[provider].allow():
+            return False
+        if not await self.buckets[provider].acquire_async():
+            self.windows[provider].release()
+            return False
+        return True
+
+    async def _get_json(self, provider: str, url: str, params: Dict) -> Optional[Dict]:
+        """GET a JSON payload; a 429 cools the provider down instead of sleeping"""
+        r = await self._get_http().get(url, params=params)
+        if r.status_code == 429:
+            print(f"⚠️ {provider} Rate Limit Hit (429). Cooling down for {RATE_LIMIT_COOLDOWN}s...")
+            self.buckets[provider].penalize(RATE_LIMIT_COOLDOWN)
+            return None
+        r.raise_for_status()
+        return orjson.loads(r.content)
+
+    async def fetch_from_finnhub(self, symbol: str) -> Optional[Dict]:
+        if not self.finnhub_key:
+            return None
+        if not await self._admit('finnhub'):
+            return None
+        try:
+            clean_symbol = symbol.replace('.IS', '.IST')
+            data = await self._get_json(
+                'finnhub', FINNHUB_QUOTE_URL,
+                {'symbol': clean_symbol, 'token': self.finnhub_key},
+            )
+            return _parse_finnhub_quote(symbol, data) if data else None
+        except Exception as e:
+            print(f"Finnhub error for {symbol}: {e}")
+            return None
+
+    async def fetch_from_alpha_vantage(self, symbol: str) -> Optional[Dict]:
+        if not self.alphavantage_key or symbol.endswith('.IS'):
+            return None
+        if not await self._admit('alpha_vantage'):
+            return None
+        try:
+            data = await self._get_json(
+                'alpha_vantage', ALPHA_VANTAGE_URL,
+                {'function': 'GLOBAL_QUOTE', 'symbol': symbol, 'apikey': self.alphavantage_key},
+            )
+            return _parse_alpha_vantage_quote(symbol, data) if data else None
+        except Exception as e:
+            print(f"Alpha Vantage error for {symbol}: {e}")
+            return None
+
+    async def fetch_from_polygon(self, symbol: str) -> Optional[Dict]:
+        if not self.polygon_key or symbol.endswith('.IS'):
+            return None
+        # Seeded by fetch_prices from the all-tickers snapshot
+        snapshot = self._sync._snapshot_cache.get('us') or {}
+        if symbol in snapshot:
+            return snapshot[symbol]
+        if not await self._admit('polygon'):
+            return None
+        try:
+            data = await self._get_json(
+                'polygon', POLYGON_PREV_URL.format(symbol=symbol),
+                {'apiKey': self.polygon_key},
+            )
+            return _parse_polygon_prev(symbol, data) if data else None
+        except Exception as e:
+            print(f"Polygon error for {symbol}: {e}")
+            return None
+
+    async def fetch_scraped_data(self, symbol: str) -> Optional[Dict]:
+        # yfinance is synchronous; keep it off the event loop
+        return await asyncio.to_thread(self._sync.fetch_scraped_data, symbol)
+
+    async def _race(self, symbol: str, chain) -> Optional[Dict]:
+        """
+        Race the chain's providers, hedged: the next one starts when every
+        running one has missed or HEDGE_DELAY has passed, and the first hit
+        cancels the rest. Later (scarcer) quotas are only spent when earlier
+        providers are slow or empty.
+        """
+        providers = iter(chain)
+        pending = set()
+        try:
+            while True:
+                provider = next(providers, None)
+                if provider is not None:
+                    pending.add(asyncio.create_task(self._fetchers[provider](symbol)))
+                if not pending:
+                    return None
+                done, pending = await asyncio.wait(
+                    pending, timeout=HEDGE_DELAY if provider is not None else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    data = task.result()
+                    if data:
+                        return data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_price(self, symbol: str, providers: Optional[tuple] = None,
+                          force_refresh: bool = False) -> Optional[Dict]:
+        """
+        Fetch current price data, served from the shared 30s cache unless
+        force_refresh. `providers` narrows _provider_chain(symbol), keeping its order.
+        """
+        if not force_refresh:
+            cached = self._price_cache.get(symbol)
+            if cached:
+                return cached
+
+        chain = [p for p in _provider_chain(symbol) if providers is None or p in providers]
+        data = await self._race(symbol, chain)
+        if data:
+            self._price_cache.set(symbol, data, PRICE_TTL)
+        return data
+
+    async def fetch_prices(self, symbols: List[str], providers: Optional[tuple] = None,
+                           force_refresh: bool = False, timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Fetch current price data for many symbols on the event loop. US symbols
+        are served from one Polygon snapshot when Polygon is in the chain.
+        Lookups still running after `timeout` seconds are cancelled; symbols
+        with no data are left out of the result.
+        """
+        if not symbols:
+            return {}
+        us_symbols = [s for s in symbols if not s.endswith('.IS')]
+        if self.polygon_key and len(us_symbols) > 1 and (providers is None or 'polygon' in providers):
+            await asyncio.to_thread(self._sync.fetch_polygon_snapshot_all)
+
+        tasks = {asyncio.create_task(self.fetch_price(s, providers, force_refresh)): s for s in symbols}
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Async router: {len(pending)}/{len(symbols)} lookups cancelled after {timeout}s")
+        return {tasks[task]: task.result() for task in done if task.result()}
+
+    def fetch_price_sync(self, symbol: str) -> Optional[Dict]:
+        """Blocking shim for legacy callers outside an event loop"""
+        async def _run():
+            try:
+                return await self.fetch_price(symbol)
+            finally:
+                await self.close()
+        return asyncio.run(_run())
+
+
 # Global router instance
 _router = None
+_router_lock = threading.Lock()
+_async_router = None
 
 def get_router() -> StockAPIRouter:
-    """Get singleton router instance"""
+    """Get singleton router instance (one session, one set of limits and caches)"""
     global _router
     if _router is None:
-        _router = StockAPIRouter()
+        with _router_lock:
+            if _router is None:
+                _router = StockAPIRouter()
     return _router
+
+def get_async_router() -> AsyncStockAPIRouter:
+    """Get the event-loop router (shares get_router()'s limits and price cache)"""
+    global _async_router
+    if _async_router is None:
+        _async_router = AsyncStockAPIRouter()
+    return _async_router
+
+async def close_async_router():
+    """Close the async router's client (called on app shutdown)"""
+    if _async_router is not None:
+        await _async_router.close()
@@ -2,10 +2,16 @@ import logging
 from typing import Optional
 
 import httpx
+import pandas as pd
 import yfinance as yf
 
+from yf_session import SESSION
+
 logger = logging.getLogger(__name__)
 
+# Pooled client for the Finnhub fallback; reused across calls and threads
+_http = httpx.Client(timeout=15)
+
 PERIOD_MAP = {
     "1d": ("5d", "15m"),
     "1w": ("5d", "15m"),
@@ -20,7 +26,7 @@ PERIOD_MAP = {
 def fetch_global_stock(symbol: str) -> Optional[dict]:
     """Fetch global/US stock data using yfinance. No suffix needed for US stocks."""
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = yf.Ticker(symbol, session=SESSION)
         fi = ticker.fast_info
 
         price = float(fi.last_price) if fi.last_price else 0.0
@@ -86,14 +92,74 @@ def fetch_global_stock(symbol: str) -> Optional[dict]:
         return None
 
 
+def fetch_stocks_batch(symbols: list[str]) -> dict[str, dict]:
+    """
+    Fetch daily quotes for many symbols in one batched yfinance download.
+    Returns {symbol: quote} with price fields only (no name or market cap);
+    bid/ask are zeroed so a stored quote from the last full fetch doesn't go
+    stale. Symbols Yahoo returned nothing for are left out.
+    """
+    if not symbols:
+        return {}
+    try:
+        df = yf.download(
+            tickers=" ".join(symbols), period="5d", interval="1d",
+            group_by="ticker", threads=True, progress=False, auto_adjust=False, session=SESSION,
+        )
+    except Exception as e:
+        logger.error("Batch download failed for %d symbols: %s", len(symbols), e)
+        return {}
+
+    if df is None or df.empty:
+        return {}
+
+    results: dict[str, dict] = {}
+    multi = isinstance(df.columns, pd.MultiIndex)
+    for symbol in symbols:
+        try:
+            if multi:
+                if symbol not in df.columns.get_level_values(0):
+                    continue
+                bars = df[symbol]
+            else:
+                bars = df
+            bars = bars.dropna(subset=["Close"])
+            if bars.empty:
+                continue
+
+            last = bars.iloc[-1]
+            price = float(last["Close"])
+            prev_close = float(bars["Close"].iloc[-2]) if len(bars) > 1 else price
+            change_pct = 0.0
+            if prev_close and prev_close > 0:
+                change_pct = round((price - prev_close) / prev_close * 100, 2)
+
+            results[symbol] = {
+                "symbol": symbol,
+                "price": price,
+                "change_pct": change_pct,
+                "volume": 0.0 if pd.isna(last["Volume"]) else float(last["Volume"]),
+                "day_high": float(last["High"]),
+                "day_low": float(last["Low"]),
+                "open": float(last["Open"]),
+                "previous_close": prev_close,
+                "bid": 0.0,
+                "ask": 0.0,
+            }
+        except Exception as e:
+            logger.warning("Batch quote parse failed for %s: %s", symbol, e)
+
+    logger.info("Batch fetched %d/%d quotes", len(results), len(symbols))
+    return results
+
+
 def fetch_global_stock_finnhub(symbol: str, api_key: str) -> Optional[dict]:
     """Fallback: fetch stock quote from Finnhub API."""
     try:
         url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={api_key}"
 
-        with httpx.Client(timeout=15) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
+        resp = _http.get(url)
+        resp.raise_for_status()
 
         data = resp.json()
 
@@ -133,10 +199,27 @@ def fetch_global_stock_finnhub(symbol: str, api_key: str) -> Optional[dict]:
         return None
 
 
-def fetch_global_history(symbol: str, period: str = "1mo") -> Optional[list[dict]]:
+def history_to_columns(hist) -> dict:
+    """Convert a yfinance history DataFrame to one list per OHLCV field."""
+    cols = hist.reindex(columns=["Open", "High", "Low", "Close", "Volume"]).fillna(0)
+    ohlc = cols[["Open", "High", "Low", "Close"]].to_numpy(dtype=float).round(4)
+    if hasattr(hist.index, "strftime"):
+        times = hist.index.strftime("%Y-%m-%d %H:%M")
+    else:
+        times = hist.index.astype(str)
+    volumes = cols["Volume"].to_numpy(dtype="int64")
+
+    opens, highs, lows, closes = ohlc.T.tolist()
+    return {
+        "time": times.tolist(), "open": opens, "high": highs, "low": lows,
+        "close": closes, "volume": volumes.tolist(),
+    }
+
+
+def fetch_global_history(symbol: str, period: str = "1mo") -> Optional[dict]:
     """Fetch historical OHLCV data for a global stock using yfinance."""
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = yf.Ticker(symbol, session=SESSION)
 
         yf_period, yf_interval = PERIOD_MAP.get(period, ("1mo", "1d"))
 
@@ -146,19 +229,9 @@ def fetch_global_history(symbol: str, period: str = "1mo") -> Optional[list[dict
             logger.warning("No history data for %s with period=%s", symbol, period)
             return None
 
-        results: list[dict] = []
-        for idx, row in hist.iterrows():
-            time_str = idx.strftime("%Y-%m-%d %H:%M") if hasattr(idx, "strftime") else str(idx)
-            results.append({
-                "time": time_str,
-                "open": round(float(row.get("Open", 0)), 4),
-                "high": round(float(row.get("High", 0)), 4),
-                "low": round(float(row.get("Low", 0)), 4),
-                "close": round(float(row.get("Close", 0)), 4),
-                "volume": int(row.get("Volume", 0)),
-            })
-
-        logger.info("Fetched %d history records for %s (%s)", len(results), symbol, period)
+        results = history_to_columns(hist)
+
+        logger.info("Fetched %d history records for %s (%s)", len(results["time"]), symbol, period)
         return results
     except Exception as e:
         logger.error("Failed to fetch global history for %s: %s", symbol, e)
@@ -168,7 +241,7 @@ def fetch_global_history(symbol: str, period: str = "1mo") -> Optional[list[dict
 def fetch_commodity_data(symbol: str) -> Optional[dict]:
     """Fetch commodity data (GC=F, SI=F, CL=F, HG=F, etc.) using yfinance."""
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = yf.Ticker(symbol, session=SESSION)
         fi = ticker.fast_info
 
         price = float(fi.last_price) if fi.last_price else 0.0
@@ -6,6 +6,9 @@ import httpx
 import yfinance as yf
 from bs4 import BeautifulSoup
 
+from data_sources.global_market import fetch_stocks_batch, history_to_columns
+from yf_session import SESSION
+
 logger = logging.getLogger(__name__)
 
 HEADERS = {
@@ -13,6 +16,13 @@ HEADERS = {
                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
+# Pooled client shared by the scrapers (thread-safe). Fallback scrapes run
+# many at once during a refresh and reuse keep-alive connections to the host.
+_http = httpx.Client(
+    headers=HEADERS, timeout=15, follow_redirects=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+)
+
 GOLD_TYPE_MAP = {
     "gram-altin": ("gram_altin", "Gram Altın"),
     "ceyrek-altin": ("ceyrek_altin", "Çeyrek Altın"),
@@ -36,7 +46,7 @@ def fetch_bist_stock(symbol: str) -> Optional[dict]:
     """Fetch BIST stock data using yfinance. Symbol should include .IS suffix."""
     try:
         ticker_symbol = symbol if symbol.endswith(".IS") else f"{symbol}.IS"
-        ticker = yf.Ticker(ticker_symbol)
+        ticker = yf.Ticker(ticker_symbol, session=SESSION)
 
         fi = ticker.fast_info
 
@@ -94,15 +104,23 @@ def fetch_bist_stock(symbol: str) -> Optional[dict]:
         return None
 
 
+def fetch_bist_stocks_batch(symbols: list[str]) -> dict[str, dict]:
+    """Batched BIST quotes keyed by the .IS symbol; see fetch_stocks_batch."""
+    tickers = [s if s.endswith(".IS") else f"{s}.IS" for s in symbols]
+    results = fetch_stocks_batch(tickers)
+    for ticker_symbol, quote in results.items():
+        quote["symbol"] = ticker_symbol.replace(".IS", "")
+    return results
+
+
 def fetch_bist_stock_fallback(symbol: str) -> Optional[dict]:
     """Fallback: scrape stock data from Google Finance."""
     try:
         clean_symbol = symbol.replace(".IS", "")
         url = f"https://www.google.com/finance/quote/{clean_symbol}:IST"
 
-        with httpx.Client(headers=HEADERS, timeout=15, follow_redirects=True) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
+        resp = _http.get(url)
+        resp.raise_for_status()
 
         soup = BeautifulSoup(resp.text, "html.parser")
 
@@ -196,9 +214,8 @@ def fetch_turkish_gold() -> Optional[list[dict]]:
     try:
         url = "https://bigpara.hurriyet.com.tr/altin/"
 
-        with httpx.Client(headers=HEADERS, timeout=15, follow_redirects=True) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
+        resp = _http.get(url)
+        resp.raise_for_status()
 
         soup = BeautifulSoup(resp.text, "html.parser")
         results: list[dict] = []
@@ -324,9 +341,8 @@ def fetch_exchange_rates() -> Optional[list[dict]]:
     try:
         url = "https://www.tcmb.gov.tr/kurlar/today.xml"
 
-        with httpx.Client(headers=HEADERS, timeout=15, follow_redirects=True) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
+        resp = _http.get(url)
+        resp.raise_for_status()
 
         root = ET.fromstring(resp.content)
 
@@ -362,7 +378,7 @@ def fetch_exchange_rates() -> Optional[list[dict]]:
             change_pct = 0.0
             try:
                 yf_symbol = f"{code}TRY=X"
-                fi = yf.Ticker(yf_symbol).fast_info
+                fi = yf.Ticker(yf_symbol, session=SESSION).fast_info
                 yf_price = float(fi.last_price) if fi.last_price else 0.0
                 yf_prev_close = float(fi.previous_close) if fi.previous_close else 0.0
                 if yf_prev_close > 0 and yf_price > 0:
@@ -389,11 +405,11 @@ def fetch_exchange_rates() -> Optional[list[dict]]:
         return None
 
 
-def fetch_bist_history(symbol: str, period: str = "1mo") -> Optional[list[dict]]:
+def fetch_bist_history(symbol: str, period: str = "1mo") -> Optional[dict]:
     """Fetch historical OHLCV data for a BIST stock using yfinance."""
     try:
         ticker_symbol = symbol if symbol.endswith(".IS") else f"{symbol}.IS"
-        ticker = yf.Ticker(ticker_symbol)
+        ticker = yf.Ticker(ticker_symbol, session=SESSION)
 
         yf_period, yf_interval = PERIOD_MAP.get(period, ("1mo", "1d"))
 
@@ -403,19 +419,9 @@ def fetch_bist_history(symbol: str, period: str = "1mo") -> Optional[list[dict]]
             logger.warning("No history data for %s with period=%s", ticker_symbol, period)
             return None
 
-        results: list[dict] = []
-        for idx, row in hist.iterrows():
-            time_str = idx.strftime("%Y-%m-%d %H:%M") if hasattr(idx, "strftime") else str(idx)
-            results.append({
-                "time": time_str,
-                "open": round(float(row.get("Open", 0)), 4),
-                "high": round(float(row.get("High", 0)), 4),
-                "low": round(float(row.get("Low", 0)), 4),
-                "close": round(float(row.get("Close", 0)), 4),
-                "volume": int(row.get("Volume", 0)),
-            })
+        results = history_to_columns(hist)
 
-        logger.info("Fetched %d history records for %s (%s)", len(results), ticker_symbol, period)
+        logger.info("Fetched %d history records for %s (%s)", len(results["time"]), ticker_symbol, period)
         return results
     except Exception as e:
         logger.error("Failed to fetch BIST history for %s: %s", symbol, e)
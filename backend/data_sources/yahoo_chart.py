@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import httpx
+import msgspec
+
+from data_sources.global_market import PERIOD_MAP
+
+logger = logging.getLogger(__name__)
+
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+# Concurrent quote requests per batch; keeps Yahoo from rate limiting a refresh
+QUOTE_CONCURRENCY = 10
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+# Typed view of the v8 chart payload; msgspec decodes straight into these and
+# skips every field we don't read
+class _Quote(msgspec.Struct):
+    open: list[Optional[float]] = []
+    high: list[Optional[float]] = []
+    low: list[Optional[float]] = []
+    close: list[Optional[float]] = []
+    volume: list[Optional[float]] = []
+
+
+class _Indicators(msgspec.Struct):
+    quote: list[_Quote] = []
+
+
+class _Meta(msgspec.Struct):
+    exchangeTimezoneName: str = "UTC"
+    currency: Optional[str] = None
+    regularMarketPrice: Optional[float] = None
+    chartPreviousClose: Optional[float] = None
+    regularMarketDayHigh: Optional[float] = None
+    regularMarketDayLow: Optional[float] = None
+    regularMarketVolume: Optional[float] = None
+
+
+class _Result(msgspec.Struct):
+    meta: _Meta = msgspec.field(default_factory=_Meta)
+    timestamp: list[int] = []
+    indicators: _Indicators = msgspec.field(default_factory=_Indicators)
+
+
+class _Chart(msgspec.Struct):
+    result: Optional[list[_Result]] = None
+
+
+class _ChartResponse(msgspec.Struct):
+    chart: _Chart = msgspec.field(default_factory=_Chart)
+
+
+_decoder = msgspec.json.Decoder(_ChartResponse)
+
+# One pooled client for the whole process; created lazily inside the running loop
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=HEADERS,
+            timeout=httpx.Timeout(10.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (called on app shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _parse_chart(content: bytes) -> Optional[dict]:
+    """Decode a v8 chart payload into the same columns fetch_*_history returns."""
+    result = _decoder.decode(content).chart.result
+    if not result:
+        return None
+    return _chart_columns(result[0])
+
+
+def _chart_columns(chart: _Result) -> Optional[dict]:
+    """OHLCV as one list per field: {"time": [...], "open": [...], ..., "volume": [...]}."""
+    quote = chart.indicators.quote[0] if chart.indicators.quote else _Quote()
+    try:
+        tz = ZoneInfo(chart.meta.exchangeTimezoneName)
+    except Exception:
+        tz = ZoneInfo("UTC")
+
+    columns = {"time": [], "open": [], "high": [], "low": [], "close": [], "volume": []}
+    volumes = quote.volume or [0] * len(chart.timestamp)
+    for ts, o, h, l, c, v in zip(chart.timestamp, quote.open, quote.high, quote.low, quote.close, volumes):
+        # Yahoo pads halted/unfilled intervals with nulls
+        if o is None or h is None or l is None or c is None:
+            continue
+        columns["time"].append(datetime.fromtimestamp(ts, tz).strftime("%Y-%m-%d %H:%M"))
+        columns["open"].append(round(o, 4))
+        columns["high"].append(round(h, 4))
+        columns["low"].append(round(l, 4))
+        columns["close"].append(round(c, 4))
+        columns["volume"].append(int(v or 0))
+    return columns if columns["time"] else None
+
+
+async def fetch_chart_history(symbol: str, period: str = "1mo") -> Optional[dict]:
+    """Fetch OHLCV bars from Yahoo's chart API without blocking the event loop."""
+    yf_period, yf_interval = PERIOD_MAP.get(period, ("1mo", "1d"))
+    try:
+        response = await get_client().get(
+            CHART_URL.format(symbol=symbol),
+            params={"range": yf_period, "interval": yf_interval},
+        )
+        response.raise_for_status()
+        results = _parse_chart(response.content)
+        if not results:
+            logger.warning("No chart data for %s with period=%s", symbol, period)
+        return results
+    except Exception as e:
+        logger.error("Failed to fetch chart for %s: %s", symbol, e)
+        return None
+
+
+def _parse_quote(symbol: str, content: bytes) -> Optional[dict]:
+    """Build a price-only quote (same shape as fetch_stocks_batch) from a 1d chart payload."""
+    result = _decoder.decode(content).chart.result
+    if not result or not result[0].meta.regularMarketPrice:
+        return None
+
+    meta = result[0].meta
+    quote = result[0].indicators.quote[0] if result[0].indicators.quote else _Quote()
+    price = float(meta.regularMarketPrice)
+    prev_close = float(meta.chartPreviousClose or price)
+    change_pct = 0.0
+    if prev_close > 0:
+        change_pct = round((price - prev_close) / prev_close * 100, 2)
+    opens = [o for o in quote.open if o is not None]
+
+    return {
+        "symbol": symbol,
+        "price": price,
+        "change_pct": change_pct,
+        "volume": float(meta.regularMarketVolume or 0),
+        "day_high": float(meta.regularMarketDayHigh or price),
+        "day_low": float(meta.regularMarketDayLow or price),
+        "open": float(opens[-1]) if opens else price,
+        "previous_close": prev_close,
+        "bid": 0.0,
+        "ask": 0.0,
+    }
+
+
+async def fetch_chart_quote(symbol: str, semaphore: asyncio.Semaphore) -> Optional[dict]:
+    """Fetch today's quote for one symbol; at most `semaphore` requests run at once."""
+    async with semaphore:
+        try:
+            response = await get_client().get(
+                CHART_URL.format(symbol=symbol), params={"range": "1d", "interval": "1d"}
+            )
+            response.raise_for_status()
+            return _parse_quote(symbol, response.content)
+        except Exception as e:
+            logger.warning("Chart quote failed for %s: %s", symbol, e)
+            return None
+
+
+async def fetch_chart_daily(symbol: str, semaphore: asyncio.Semaphore, range_: str = "6mo") -> Optional[dict]:
+    """Daily bars plus the listing currency: {"bars": {"time": [...], ...}, "currency": str | None}."""
+    async with semaphore:
+        try:
+            response = await get_client().get(
+                CHART_URL.format(symbol=symbol), params={"range": range_, "interval": "1d"}
+            )
+            response.raise_for_status()
+            result = _decoder.decode(response.content).chart.result
+        except Exception as e:
+            logger.warning("Daily chart failed for %s: %s", symbol, e)
+            return None
+    if not result:
+        return None
+    bars = _chart_columns(result[0])
+    return {"bars": bars, "currency": result[0].meta.currency} if bars else None
+
+
+async def fetch_chart_dailies(symbols: list[str], range_: str = "6mo",
+                              concurrency: int = QUOTE_CONCURRENCY) -> dict[str, dict]:
+    """fetch_chart_daily for many symbols concurrently; symbols with no data are left out."""
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = await asyncio.gather(*(fetch_chart_daily(s, semaphore, range_) for s in symbols))
+    return {s: d for s, d in zip(symbols, fetched) if d}
+
+
+async def fetch_chart_quotes(symbols: list[str], concurrency: int = QUOTE_CONCURRENCY) -> dict[str, dict]:
+    """Fetch quotes for many symbols concurrently; symbols with no data are left out."""
+    if not symbols:
+        return {}
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = await asyncio.gather(*(fetch_chart_quote(s, semaphore) for s in symbols))
+    return {s: q for s, q in zip(symbols, fetched) if q}
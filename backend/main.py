@@ -1,24 +1,41 @@
 import os
+import gzip
+import hashlib
+import time
 import asyncio
 import logging
+import tempfile
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Body
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Body, Request
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import Response, FileResponse
+from fastapi.responses import Response, FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 from sqlalchemy import select, desc, text
+from cachetools import TTLCache
+import orjson
+# Imported at startup so the first export doesn't pay pandas/xlsxwriter import time
+import pandas as pd
+import xlsxwriter
+from xlsxwriter.utility import xl_rowcol_to_cell
 
 from database import init_db, AsyncSessionLocal, engine
 from models import StockData, TurkishGold, ExchangeRate, AIInsight
 from analysis import (
-    analyze_stock, get_market_opportunities, get_bulk_analysis,
+    cached_analyze, get_market_opportunities, get_bulk_analysis_async,
     BIST_SYMBOLS, GLOBAL_SYMBOLS, COMMODITIES_SYMBOLS
 )
 from ai_service import get_market_insight, get_stock_analysis
-from workers import refresh_all_data, start_periodic_refresh
+from workers import refresh_all_data, start_periodic_refresh, last_refresh_time, _enrich_stock_data
+from data_sources.yahoo_chart import fetch_chart_history, fetch_chart_quotes, get_client, close_client
+from data_sources.turkish_market import fetch_bist_history
+from data_sources.global_market import fetch_global_history
+from api_router import close_async_router
+import shared_cache
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +44,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# O(1) symbol classification for the per-symbol routes
+_GLOBAL_UPPER = frozenset(s.upper() for s in GLOBAL_SYMBOLS)
+_ALL_SYMBOLS = tuple(BIST_SYMBOLS) + tuple(GLOBAL_SYMBOLS)
+
+# The symbol lists are fixed at import, so /api/stocks is one constant body
+_STOCKS_BODY = orjson.dumps({
+    "stocks": _ALL_SYMBOLS,
+    "commodities": tuple(COMMODITIES_SYMBOLS),
+    "bist_count": len(BIST_SYMBOLS),
+    "global_count": len(GLOBAL_SYMBOLS),
+    "commodity_count": len(COMMODITIES_SYMBOLS),
+})
+
 # ============================================================
 # APP LIFECYCLE
 # ============================================================
@@ -44,14 +74,39 @@ async def lifespan(app: FastAPI):
     refresh_task = asyncio.create_task(start_periodic_refresh(interval_minutes=10))
     logger.info("✅ Background refresh worker started (every 10 min)")
 
+    # Open the shared HTTP/2 client (chart, quotes, bulk export) before traffic arrives
+    get_client()
+
+    # Build the market-data snapshot from what's already in the DB right away
+    # (the first refresh above takes minutes), then keep it warm
+    warm_task = asyncio.create_task(_periodic_market_warm())
+    # Drop the L1 snapshot whenever any worker finishes a refresh (Redis only)
+    invalidate_task = asyncio.create_task(shared_cache.listen_for_invalidations(_clear_market_caches))
+
     yield
 
     # Shutdown
+    invalidate_task.cancel()
+    warm_task.cancel()
     refresh_task.cancel()
+    await close_client()
+    await close_async_router()
+    await shared_cache.close_redis()
     logger.info("🛑 Wolfee Analytics shutting down")
 
 
-app = FastAPI(title="Wolfee Analytics", lifespan=lifespan)
+class ORJSONResponse(JSONResponse):
+    """
+    JSON via orjson (NumPy values included); FastAPI's own class is deprecated.
+    As the default class it still gets FastAPI's jsonable_encoder pass first;
+    handlers with large payloads return it directly to skip that walk.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+app = FastAPI(title="Wolfee Analytics", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # ============================================================
 # CORS
@@ -70,6 +125,15 @@ railway_domain = os.getenv("RAILWAY_PUBLIC_DOMAIN")
 if railway_domain:
     origins.append(f"https://{railway_domain}")
 
+# ============================================================
+# COMPRESSION
+# ============================================================
+# Market JSON repeats the same keys for every stock and shrinks 5-10x.
+# Registered before CORS so CORS stays the outermost layer and answers
+# preflights without them passing through compression.
+GZIP_LEVEL = 5
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=GZIP_LEVEL)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all for flexibility
@@ -100,9 +164,18 @@ async def health_check():
     try:
         async with AsyncSessionLocal() as session:
             await session.execute(text("SELECT 1"))
-        return {"status": "healthy", "service": "Wolfee Analytics API", "database": "connected"}
+        database = "connected"
     except Exception:
-        return {"status": "degraded", "service": "Wolfee Analytics API", "database": "disconnected"}
+        database = "disconnected"
+
+    return {
+        "status": "healthy" if database == "connected" else "degraded",
+        "service": "Wolfee Analytics API",
+        "database": database,
+        # "warm" once a market snapshot is in memory; "cold" until then
+        "cache": "warm" if _market_stale is not None else "cold",
+        "last_refresh": last_refresh_time() or None,
+    }
 
 
 # ============================================================
@@ -112,35 +185,162 @@ async def health_check():
 @app.get("/api/stocks")
 async def get_stocks():
     """Returns list of supported symbols."""
-    return {
-        "stocks": BIST_SYMBOLS + GLOBAL_SYMBOLS,
-        "commodities": list(COMMODITIES_SYMBOLS.keys()),
-        "bist_count": len(BIST_SYMBOLS),
-        "global_count": len(GLOBAL_SYMBOLS),
-        "commodity_count": len(COMMODITIES_SYMBOLS),
-    }
+    return Response(_STOCKS_BODY, media_type="application/json")
+
+
+# Market-data snapshot shared by the quick/full endpoints (L1, per worker;
+# Redis is the optional L2). Entries are keyed by the last worker refresh, so
+# a finished refresh triggers a rebuild on the next request. Past
+# MARKET_CACHE_TTL the previous snapshot is still served for up to
+# MARKET_STALE_TTL while it is rebuilt in the background.
+MARKET_CACHE_TTL = 300
+MARKET_STALE_TTL = 3600
+MARKET_PREFETCH_LEAD = 30  # rebuild this long before the fresh entry expires
+MARKET_WARM_POLL = 5
+MARKET_CACHE_CONTROL = "max-age=30"
+_market_cache = TTLCache(maxsize=4, ttl=MARKET_CACHE_TTL)
+_market_lock = asyncio.Lock()
+_market_stale: Optional[tuple] = None
+_market_rebuild: Optional[asyncio.Task] = None
+
+
+def _market_entry(stock_list: list) -> tuple:
+    """L1 entry: (built at, stock dicts, {"stocks": ...} body, gzipped body, ETag)"""
+    body = orjson.dumps({"stocks": stock_list}, option=orjson.OPT_SERIALIZE_NUMPY)
+    # Weak: the identity and gzip bodies are the same content under one tag
+    etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+    return time.time(), stock_list, body, gzip.compress(body, compresslevel=GZIP_LEVEL), etag
+
+
+def _json_bytes_response(request: Request, body: bytes, gz_body: bytes, etag: str) -> Response:
+    """
+    Pre-serialized JSON, sent pre-compressed when the client accepts gzip.
+    Pollers that send back the snapshot's ETag get a bodiless 304.
+    """
+    headers = {"Vary": "Accept-Encoding", "ETag": etag, "Cache-Control": MARKET_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        # GZipMiddleware passes responses that already carry an encoding
+        headers["Content-Encoding"] = "gzip"
+        return Response(gz_body, media_type="application/json", headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def _load_market_snapshot(force: bool = False) -> tuple:
+    """(stock dicts, JSON body, gzipped body, ETag) from the DB, served from _market_cache when warm."""
+    global _market_rebuild
+    key = ('stocks', last_refresh_time())
+    if not force:
+        cached = _market_cache.get(key)
+        if cached is not None:
+            return cached[1:]
+
+        # Stale-while-revalidate: answer from the last snapshot, rebuild once in the background
+        stale = _market_stale
+        if stale is not None and time.time() - stale[0] < MARKET_STALE_TTL:
+            if _market_rebuild is None or _market_rebuild.done():
+                _market_rebuild = asyncio.create_task(_rebuild_market_snapshot(key))
+            return stale[1:]
+
+    return await _build_market_snapshot(key, force)
+
+
+async def _rebuild_market_snapshot(key: tuple):
+    try:
+        await _build_market_snapshot(key)
+    except Exception as e:
+        logger.error(f"Market cache rebuild error: {e}")
+
+
+async def _build_market_snapshot(key: tuple, force: bool = False) -> tuple:
+    """Fill _market_cache[key] from Redis or the DB; one build at a time."""
+    global _market_stale
+    async with _market_lock:
+        # Another request may have filled it while we waited
+        cached = _market_cache.get(key)
+        if cached is not None and not force:
+            return cached[1:]
+
+        stock_list = None if force else await shared_cache.get_json(shared_cache.MARKET_STOCKS_KEY)
+        if stock_list:
+            entry = _market_cache[key] = _market_stale = _market_entry(stock_list)
+            return entry[1:]
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(StockData).order_by(StockData.market_type, StockData.symbol)
+            )
+            stock_list = [_stock_to_dict(s) for s in result.scalars().all() if s.price and s.price > 0]
+
+        if cached is not None:
+            logger.info(f"Market cache rebuilt after {time.time() - cached[0]:.0f}s")
+        entry = _market_entry(stock_list)
+        if stock_list:
+            # Don't pin an empty table; the first-load path has to see it
+            _market_cache[key] = _market_stale = entry
+            await shared_cache.set_json(shared_cache.MARKET_STOCKS_KEY, stock_list, MARKET_CACHE_TTL)
+        return entry[1:]
+
+
+async def _periodic_market_warm():
+    """
+    Keep the market-data snapshot fresh so requests never wait on a rebuild:
+    prefetch it MARKET_PREFETCH_LEAD seconds before the TTL runs out, and
+    right after a worker refresh lands.
+    """
+    while True:
+        try:
+            key = ('stocks', last_refresh_time())
+            built = _market_stale[0] if _market_stale is not None else None
+            if built is not None and time.time() >= built + MARKET_CACHE_TTL - MARKET_PREFETCH_LEAD:
+                await _build_market_snapshot(key, force=True)
+            elif key not in _market_cache:
+                await _build_market_snapshot(key)
+        except Exception as e:
+            logger.error(f"Market cache warm error: {e}")
+        await asyncio.sleep(MARKET_WARM_POLL)
+
+
+# A few quotes to show while the first refresh fills an empty DB
+FIRST_PAINT_SYMBOLS = (
+    [(s, 'BIST', 'TRY') for s in BIST_SYMBOLS[:3]]
+    + [(s, 'GLOBAL', 'USD') for s in GLOBAL_SYMBOLS[:3]]
+    + [(s, 'COMMODITY', 'USD') for s in list(COMMODITIES_SYMBOLS)[:2]]
+)
+
+
+async def _first_paint_stocks() -> list:
+    """Fetch FIRST_PAINT_SYMBOLS in one concurrent batch, in stock-dict shape."""
+    quotes = await fetch_chart_quotes([s for s, _, _ in FIRST_PAINT_SYMBOLS])
+    stocks = []
+    for symbol, market_type, currency in FIRST_PAINT_SYMBOLS:
+        quote = quotes.get(symbol)
+        if not quote:
+            continue
+        short = symbol.replace('.IS', '')
+        quote.update(symbol=short, name=COMMODITIES_SYMBOLS.get(symbol, short))
+        stocks.append(_enrich_stock_data({'bid': 0, 'ask': 0, 'market_cap': 0, **quote}, market_type, currency))
+    return stocks
 
 
 @app.get("/api/market-data/quick")
-async def get_quick_market_data(background_tasks: BackgroundTasks):
+async def get_quick_market_data(request: Request, background_tasks: BackgroundTasks):
     """
     Fetch market data from PostgreSQL (instant).
     If DB is empty, triggers background refresh and returns what's available.
     """
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(StockData).order_by(StockData.market_type, StockData.symbol)
-            )
-            stocks = result.scalars().all()
+        stock_list, body, gz_body, etag = await _load_market_snapshot()
 
-            if not stocks:
-                # DB is empty — trigger refresh and return empty
-                background_tasks.add_task(_sync_refresh)
-                return {"stocks": [], "status": "loading", "message": "First load — data is being fetched. Refresh in 30 seconds."}
+        if not stock_list:
+            # DB is empty — trigger refresh and return a first batch meanwhile
+            background_tasks.add_task(refresh_all_data)
+            return {"stocks": await _first_paint_stocks(), "status": "loading", "message": "First load — data is being fetched. Refresh in 30 seconds."}
 
-            stock_list = [_stock_to_dict(s) for s in stocks if s.price and s.price > 0]
-            return {"stocks": stock_list}
+        # Already serialized (and compressed) when the snapshot was built
+        return _json_bytes_response(request, body, gz_body, etag)
 
     except Exception as e:
         logger.error(f"Quick market data error: {e}")
@@ -148,24 +348,20 @@ async def get_quick_market_data(background_tasks: BackgroundTasks):
 
 
 @app.get("/api/market-data/full")
-async def get_full_market_data():
+async def get_full_market_data(request: Request):
     """Returns ALL stocks from DB."""
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(StockData).order_by(StockData.market_type, StockData.symbol)
-            )
-            stocks = result.scalars().all()
-            return {"stocks": [_stock_to_dict(s) for s in stocks if s.price and s.price > 0]}
+        _, body, gz_body, etag = await _load_market_snapshot()
+        return _json_bytes_response(request, body, gz_body, etag)
     except Exception as e:
         logger.error(f"Full market data error: {e}")
         return {"stocks": []}
 
 
 @app.get("/api/market-data")
-async def get_market_data(background_tasks: BackgroundTasks):
+async def get_market_data(request: Request, background_tasks: BackgroundTasks):
     """Legacy endpoint."""
-    return await get_quick_market_data(background_tasks)
+    return await get_quick_market_data(request, background_tasks)
 
 
 # ============================================================
@@ -220,47 +416,74 @@ async def get_exchange_rates():
 # STOCK ANALYSIS & HISTORY
 # ============================================================
 
+# In-flight analyses by (symbol, is_commodity, detailed). Concurrent requests
+# for the same symbol share one fetch instead of each missing the cache.
+_analyze_inflight: dict[tuple, asyncio.Future] = {}
+
+
+async def _analyze(symbol: str, is_commodity: bool = False, detailed: bool = False):
+    """cached_analyze on a worker thread, single-flighted per key."""
+    key = (symbol, is_commodity, detailed)
+    future = _analyze_inflight.get(key)
+    if future is None:
+        # No await between the lookup and the insert, so this can't race on the loop
+        future = asyncio.ensure_future(asyncio.to_thread(cached_analyze, *key))
+        _analyze_inflight[key] = future
+        future.add_done_callback(lambda _: _analyze_inflight.pop(key, None))
+    # Shielded so one caller disconnecting doesn't cancel the others' fetch
+    return await asyncio.shield(future)
+
+
 @app.get("/api/analyze/{symbol}")
 async def get_stock_analysis_endpoint(symbol: str):
     """Returns analysis for a specific stock."""
     # Auto-append .IS if needed
     if "=" not in symbol and not symbol.endswith(".IS"):
         # Check if it's a global symbol
-        if symbol.upper() not in [s.upper() for s in GLOBAL_SYMBOLS]:
+        if symbol.upper() not in _GLOBAL_UPPER:
             symbol += ".IS"
 
     is_commodity = "=" in symbol
-    data = analyze_stock(symbol, is_commodity, detailed=True)
+    data = await _analyze(symbol, is_commodity, True)
     if not data:
         raise HTTPException(status_code=404, detail="Stock data not found")
-    return data
+    return ORJSONResponse(data)
+
+
+async def _fetch_history(symbol: str, period: str) -> Optional[dict]:
+    """
+    Columnar bars ({"time": [...], "open": [...], ...}) from Yahoo's chart API
+    on the event loop; yfinance in a thread as fallback.
+    """
+    data = await fetch_chart_history(symbol, period)
+    if data:
+        return data
+
+    if symbol.endswith(".IS"):
+        return await asyncio.to_thread(fetch_bist_history, symbol, period)
+    return await asyncio.to_thread(fetch_global_history, symbol, period)
 
 
 @app.get("/api/history/{symbol}")
 async def get_stock_history(symbol: str, period: str = "1y"):
     """Returns historical price data for charts."""
-    is_global = symbol.upper() in [s.upper() for s in GLOBAL_SYMBOLS]
+    is_global = symbol.upper() in _GLOBAL_UPPER
     is_commodity = "=" in symbol
 
     if not is_global and not is_commodity and not symbol.endswith(".IS"):
         symbol += ".IS"
 
     try:
-        if symbol.endswith(".IS"):
-            from data_sources.turkish_market import fetch_bist_history
-            data = fetch_bist_history(symbol, period)
-        else:
-            from data_sources.global_market import fetch_global_history
-            data = fetch_global_history(symbol, period)
-
-        if not data or not data.get('history'):
+        data = await _fetch_history(symbol, period)
+
+        if not data:
             raise HTTPException(status_code=404, detail="No history found")
 
-        return {
+        return ORJSONResponse({
             "symbol": symbol,
             "name": symbol,
-            "history": data["history"]
-        }
+            "history": data
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -271,26 +494,19 @@ async def get_stock_history(symbol: str, period: str = "1y"):
 @app.get("/api/chart/{symbol}/{period}")
 async def get_chart_data(symbol: str, period: str):
     """Chart data endpoint for frontend."""
-    is_global = symbol.upper() in [s.upper() for s in GLOBAL_SYMBOLS]
+    is_global = symbol.upper() in _GLOBAL_UPPER
     is_commodity = "=" in symbol
 
     if not symbol.endswith('.IS') and not is_global and "=" not in symbol:
         symbol += '.IS'
 
     try:
-        if symbol.endswith(".IS"):
-            from data_sources.turkish_market import fetch_bist_history
-            data = fetch_bist_history(symbol, period)
-        else:
-            from data_sources.global_market import fetch_global_history
-            data = fetch_global_history(symbol, period)
+        data = await _fetch_history(symbol, period)
 
         if not data:
             raise HTTPException(status_code=404, detail="No chart data available")
 
-        return {"history": data}
-
-        return data
+        return ORJSONResponse({"history": data})
 
     except HTTPException:
         raise
@@ -303,43 +519,83 @@ async def get_chart_data(symbol: str, period: str):
 # OPPORTUNITIES & AI INSIGHTS
 # ============================================================
 
+# Opportunity scan and insight text, shared by the /api/* routes and their
+# aliases. Keyed by the last worker refresh like the market snapshot, and
+# cleared with it when another worker publishes a refresh.
+OPPORTUNITIES_TTL = 120
+_opportunities_cache = TTLCache(maxsize=1, ttl=OPPORTUNITIES_TTL)
+_insight_cache = TTLCache(maxsize=1, ttl=OPPORTUNITIES_TTL)
+# One rebuild per key: concurrent misses wait for it instead of each
+# rescanning (or each calling the AI service)
+_opportunities_lock = asyncio.Lock()
+_insight_lock = asyncio.Lock()
+
+
+def _clear_market_caches():
+    """Drop everything derived from the market data (another worker refreshed it)."""
+    _market_cache.clear()
+    _opportunities_cache.clear()
+    _insight_cache.clear()
+
+
+async def _cached_opportunities() -> list:
+    """Buy opportunities computed once per refresh/TTL from the market snapshot."""
+    key = last_refresh_time()
+    opps = _opportunities_cache.get(key)
+    if opps is not None:
+        return opps
+
+    async with _opportunities_lock:
+        opps = _opportunities_cache.get(key)
+        if opps is None:
+            stock_list = (await _load_market_snapshot())[0]
+            # An empty table makes get_market_opportunities scan live, which blocks
+            opps = await asyncio.to_thread(get_market_opportunities, stock_list)
+            _opportunities_cache[key] = opps
+    return opps
+
+
 @app.get("/api/opportunities")
 async def get_opportunities():
     """Returns buy opportunities from DB."""
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(select(StockData))
-            stocks = result.scalars().all()
-            stock_list = [_stock_to_dict(s) for s in stocks]
-            opps = get_market_opportunities(cached_data=stock_list)
-            return {"opportunities": opps}
+        return ORJSONResponse({"opportunities": await _cached_opportunities()})
     except Exception as e:
         logger.error(f"Opportunities error: {e}")
         return {"opportunities": []}
 
 
+async def _latest_insight_text() -> str:
+    """Stored daily insight, or one generated from the market snapshot."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(AIInsight)
+            .where(AIInsight.insight_type == 'daily')
+            .order_by(desc(AIInsight.created_at))
+            .limit(1)
+        )
+        insight = result.scalar_one_or_none()
+
+        if insight and insight.insight_text:
+            return insight.insight_text
+
+    # Generate on-the-fly if no cached insight
+    stock_list = (await _load_market_snapshot())[0]
+    return await asyncio.to_thread(get_market_insight, stock_list[:50])
+
+
 @app.get("/api/insight")
 async def get_insight():
-    """Returns latest AI insight from DB."""
+    """Returns latest AI insight, read (or generated) once per refresh/TTL."""
     try:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(AIInsight)
-                .where(AIInsight.insight_type == 'daily')
-                .order_by(desc(AIInsight.created_at))
-                .limit(1)
-            )
-            insight = result.scalar_one_or_none()
-
-            if insight and insight.insight_text:
-                return {"insight": insight.insight_text}
-
-            # Generate on-the-fly if no cached insight
-            stock_result = await session.execute(select(StockData).limit(50))
-            stocks = stock_result.scalars().all()
-            stock_list = [_stock_to_dict(s) for s in stocks]
-            insight_text = get_market_insight(stock_list)
-            return {"insight": insight_text}
+        key = last_refresh_time()
+        insight_text = _insight_cache.get(key)
+        if insight_text is None:
+            async with _insight_lock:
+                insight_text = _insight_cache.get(key)
+                if insight_text is None:
+                    insight_text = _insight_cache[key] = await _latest_insight_text()
+        return {"insight": insight_text}
 
     except Exception as e:
         logger.error(f"Insight error: {e}")
@@ -361,12 +617,11 @@ async def get_ai_stock_analysis(symbol: str):
                 stock_data = _stock_to_dict(stock)
             else:
                 # Fetch fresh
-                stock_data = analyze_stock(symbol)
+                stock_data = await _analyze(symbol)
 
             if not stock_data:
                 raise HTTPException(status_code=404, detail="Stock not found")
 
-            import asyncio
             analysis = await asyncio.to_thread(get_stock_analysis, symbol, stock_data)
             return {"symbol": symbol, "analysis": analysis}
 
@@ -384,27 +639,17 @@ async def get_ai_stock_analysis(symbol: str):
 @app.post("/api/refresh")
 async def trigger_refresh(background_tasks: BackgroundTasks):
     """Manually trigger a full data refresh."""
-    background_tasks.add_task(_sync_refresh)
+    background_tasks.add_task(refresh_all_data)
     return {"status": "Refresh triggered", "message": "Data will be updated in the background."}
 
 
 @app.get("/api/refresh")
 async def trigger_refresh_get(background_tasks: BackgroundTasks):
     """GET version of refresh for easy browser access."""
-    background_tasks.add_task(_sync_refresh)
+    background_tasks.add_task(refresh_all_data)
     return {"status": "Refresh triggered"}
 
 
-def _sync_refresh():
-    """Run async refresh in sync context (for BackgroundTasks)."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(refresh_all_data())
-    finally:
-        loop.close()
-
-
 # ============================================================
 # ROUTE ALIASES (backward compatibility)
 # ============================================================
@@ -485,7 +730,7 @@ async def export_portfolio_post(payload: dict = Body(...)):
         if not results:
             raise HTTPException(status_code=404, detail="No data found for provided symbols")
 
-        return _create_excel_response(results, f"portfolio_{period}", f"Portfolio {period.capitalize()}")
+        return await _create_excel_response(results, f"portfolio_{period}", f"Portfolio {period.capitalize()}")
 
     except HTTPException:
         raise
@@ -496,7 +741,7 @@ async def export_portfolio_post(payload: dict = Body(...)):
 
 @app.get("/api/export/portfolio")
 async def export_portfolio_get(symbols: str, period: str):
-    """Fallback GET export for portfolio — re-fetches live data per symbol."""
+    """Fallback GET export for portfolio — re-fetches live data for all symbols concurrently."""
     try:
         if period not in ["daily", "weekly", "monthly"]:
             raise HTTPException(status_code=400, detail="Invalid period")
@@ -508,8 +753,12 @@ async def export_portfolio_get(symbols: str, period: str):
         results = []
         today = datetime.now().strftime("%Y-%m-%d")
 
-        for symbol in symbol_list:
-            data = analyze_stock(symbol, is_commodity="=" in symbol)
+        # Fetch every symbol at once (cache hits return immediately); rows keep the requested order
+        fetched = await asyncio.gather(
+            *(_analyze(symbol, "=" in symbol) for symbol in symbol_list)
+        )
+
+        for symbol, data in zip(symbol_list, fetched):
             if data:
                 price = data.get('price', 0) or 0
                 change_p = data.get('change_pct', 0) or 0
@@ -566,7 +815,7 @@ async def export_portfolio_get(symbols: str, period: str):
         if not results:
             raise HTTPException(status_code=404, detail="No symbols provided")
 
-        return _create_excel_response(results, f"portfolio_{period}", f"Portfolio {period.capitalize()}")
+        return await _create_excel_response(results, f"portfolio_{period}", f"Portfolio {period.capitalize()}")
 
     except HTTPException:
         raise
@@ -581,18 +830,33 @@ async def export_analysis(period: str):
     if period not in ["daily", "weekly", "monthly"]:
         raise HTTPException(status_code=400, detail="Invalid period. Use daily, weekly, or monthly.")
 
-    data = get_bulk_analysis(period)
+    data = await get_bulk_analysis_async(period)
     if not data:
         raise HTTPException(status_code=404, detail="No data available for export.")
 
-    return _create_excel_response(data, f"wolfee_market_{period}", period.capitalize())
+    return await _create_excel_response(data, f"wolfee_market_{period}", period.capitalize())
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
 
-def _create_excel_response(data: list, filename: str, sheet_name: str) -> Response:
-    """Create a professionally formatted Excel file."""
-    import io
-    import pandas as pd
-    from openpyxl.styles import Alignment, Font, PatternFill, Border, Side, numbers
+async def _create_excel_response(data: list, filename: str, sheet_name: str) -> FileResponse:
+    """Build the workbook on a worker thread and send it as an attachment."""
+    # pandas + xlsxwriter take hundreds of ms on a large export; keep that off the event loop
+    path = await asyncio.to_thread(_write_excel_file, data, sheet_name)
 
+    # Sent from disk in chunks with a Content-Length; removed once it's out
+    return FileResponse(
+        path,
+        media_type=XLSX_MIME,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}.xlsx"
+        },
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+def _write_excel_file(data: list, sheet_name: str) -> str:
+    """Write a professionally formatted Excel file to a temp path and return the path."""
     df = pd.DataFrame(data)
 
     columns_order = [
@@ -607,122 +871,81 @@ def _create_excel_response(data: list, filename: str, sheet_name: str) -> Respon
             df[col] = ""
 
     df = df.reindex(columns=columns_order)
+    df = df.astype(object).where(df.notna(), "")
 
-    output = io.BytesIO()
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook = writer.book
-        ws = writer.sheets[sheet_name]
-
-        # Styles
-        center = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        left = Alignment(horizontal='left', vertical='center')
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_fill = PatternFill(start_color="1B3A5C", end_color="1B3A5C", fill_type="solid")
-        alt_fill = PatternFill(start_color="F0F4F8", end_color="F0F4F8", fill_type="solid")
-        gain_font = Font(color="157A3B", bold=True)
-        loss_font = Font(color="C0392B", bold=True)
-        thin_border = Border(
-            left=Side(style='thin', color='D0D5DD'),
-            right=Side(style='thin', color='D0D5DD'),
-            top=Side(style='thin', color='D0D5DD'),
-            bottom=Side(style='thin', color='D0D5DD')
-        )
-        number_format_price = '#,##0.00'
-        number_format_pct = '0.00"%"'
-        number_format_int = '#,##0'
-
-        # Format header row
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center
-            cell.border = thin_border
-
-        # Format data rows
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, max_row=ws.max_row), start=2):
-            fill = alt_fill if row_idx % 2 == 0 else PatternFill()
-
-            for col_idx, cell in enumerate(row, start=1):
-                cell.alignment = center
-                cell.border = thin_border
-                if fill.fgColor and fill.fgColor.rgb != '00000000':
-                    cell.fill = fill
-
-                col_name = columns_order[col_idx - 1] if col_idx <= len(columns_order) else ""
-
-                # Number formatting
-                if col_name in ["Current Price", "Start Price", "Change Amt", "Period High", "Period Low", "MA(20)"]:
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = number_format_price
-
-                elif col_name == "Change %":
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = '0.00'
-                        if cell.value > 0:
-                            cell.font = gain_font
-                        elif cell.value < 0:
-                            cell.font = loss_font
-
-                elif col_name == "Volume (Period)":
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = number_format_int
-
-                elif col_name == "RSI (14)":
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = '0.00'
-
-                # Name column left-aligned
-                if col_name in ["Name", "Symbol"]:
-                    cell.alignment = left
-
-                # Trend column coloring
-                if col_name == "Trend":
-                    val = str(cell.value or "")
-                    if "UP" in val:
-                        cell.font = gain_font
-                    elif "DOWN" in val:
-                        cell.font = loss_font
-
-                # RSI Status coloring
-                if col_name == "RSI Status":
-                    val = str(cell.value or "")
-                    if "Overbought" in val:
-                        cell.font = loss_font
-                    elif "Oversold" in val:
-                        cell.font = gain_font
-
-        # Auto-fit column widths
-        for col_idx, column_cells in enumerate(ws.columns, start=1):
-            max_length = 0
-            for cell in column_cells:
-                try:
-                    cell_len = len(str(cell.value or ""))
-                    if cell_len > max_length:
-                        max_length = cell_len
-                except:
-                    pass
-            from openpyxl.utils import get_column_letter
-            col_letter = get_column_letter(col_idx)
-            ws.column_dimensions[col_letter].width = min(max(max_length + 3, 10), 30)
+    # constant_memory flushes each row as it is written, so widths are
+    # computed up front instead of by re-reading every cell afterwards
+    text_lengths = df.astype(str).apply(lambda c: c.str.len()).max().fillna(0)
+    widths = (text_lengths.clip(lower=df.columns.str.len()) + 3).clip(10, 30).astype(int).tolist()
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        ws = workbook.add_worksheet(sheet_name)
+
+        # Styles: one default format per column (the xlsxwriter analogue of a
+        # NamedStyle); colouring and row banding are conditional formats, so
+        # rows are written without any per-cell style decisions
+        border = {'border': 1, 'border_color': '#D0D5DD'}
+        header_fmt = workbook.add_format({
+            'bold': True, 'font_color': '#FFFFFF', 'font_size': 11, 'bg_color': '#1B3A5C',
+            'align': 'center', 'valign': 'vcenter', 'text_wrap': True, **border
+        })
+        number_formats = {
+            "Current Price": '#,##0.00', "Start Price": '#,##0.00', "Change Amt": '#,##0.00',
+            "Period High": '#,##0.00', "Period Low": '#,##0.00', "MA(20)": '#,##0.00',
+            "Change %": '0.00', "RSI (14)": '0.00', "Volume (Period)": '#,##0',
+        }
+        gain_fmt = workbook.add_format({'bold': True, 'font_color': '#157A3B'})
+        loss_fmt = workbook.add_format({'bold': True, 'font_color': '#C0392B'})
+        band_fmt = workbook.add_format({'bg_color': '#F0F4F8'})
+
+        for col_idx, (col_name, width) in enumerate(zip(columns_order, widths)):
+            props = {'align': 'center', 'valign': 'vcenter', 'text_wrap': True, **border}
+            if col_name in ["Name", "Symbol"]:
+                props.update(align='left', text_wrap=False)
+            if col_name in number_formats:
+                props['num_format'] = number_formats[col_name]
+            ws.set_column(col_idx, col_idx, width, workbook.add_format(props))
+
+        ws.write_row(0, 0, columns_order, header_fmt)
+        for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+            ws.write_row(row_idx, 0, row)
+
+        last_row, last_col = len(df), len(columns_order) - 1
+        if last_row:
+            def col_range(name):
+                idx = columns_order.index(name)
+                return (1, idx, last_row, idx)
+
+            ws.conditional_format(1, 0, last_row, last_col, {
+                'type': 'formula', 'criteria': '=MOD(ROW(),2)=0', 'format': band_fmt
+            })
+            ws.conditional_format(*col_range("Change %"), {'type': 'cell', 'criteria': '>', 'value': 0, 'format': gain_fmt})
+            ws.conditional_format(*col_range("Change %"), {'type': 'cell', 'criteria': '<', 'value': 0, 'format': loss_fmt})
+            # FIND() is case-sensitive, unlike the 'containing' criterion (SEARCH),
+            # so "Slight upward movement" doesn't match "UP"
+            for name, word, fmt in (("Trend", "UP", gain_fmt), ("Trend", "DOWN", loss_fmt),
+                                    ("RSI Status", "Overbought", loss_fmt), ("RSI Status", "Oversold", gain_fmt)):
+                first = xl_rowcol_to_cell(1, columns_order.index(name), col_abs=True)
+                ws.conditional_format(*col_range(name), {
+                    'type': 'formula', 'criteria': f'=ISNUMBER(FIND("{word}",{first}))', 'format': fmt
+                })
 
         # Freeze top row
-        ws.freeze_panes = 'A2'
+        ws.freeze_panes(1, 0)
 
         # Add auto-filter
-        ws.auto_filter.ref = ws.dimensions
+        ws.autofilter(0, 0, last_row, last_col)
 
-    output.seek(0)
+        workbook.close()
+    except Exception:
+        os.remove(path)
+        raise
 
-    return Response(
-        content=output.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}.xlsx"
-        }
-    )
+    return path
 
 
 # ============================================================
@@ -0,0 +1,89 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Optional Redis L2 cache shared by all uvicorn workers. Without REDIS_URL
+# every helper below is a no-op and each worker relies on its own L1 cache.
+REDIS_URL = os.getenv("REDIS_URL")
+
+MARKET_STOCKS_KEY = "marketdata:stocks:v1"
+INVALIDATE_CHANNEL = "marketdata:invalidate"
+
+_redis = None
+
+
+def get_redis():
+    """Lazily create the shared async Redis client (None when not configured)."""
+    global _redis
+    if _redis is None and REDIS_URL:
+        try:
+            import redis.asyncio as redis
+            _redis = redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed")
+    return _redis
+
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+    _redis = None
+
+
+async def get_json(key: str) -> Optional[object]:
+    r = get_redis()
+    if r is None:
+        return None
+    try:
+        raw = await r.get(key)
+        return orjson.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"Redis get {key} failed: {e}")
+        return None
+
+
+async def set_json(key: str, value, ttl: int):
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        await r.setex(key, ttl, orjson.dumps(value))
+    except Exception as e:
+        logger.warning(f"Redis set {key} failed: {e}")
+
+
+async def invalidate_market_data():
+    """Drop the shared snapshot and tell every worker to drop its L1 copy."""
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        await r.delete(MARKET_STOCKS_KEY)
+        await r.publish(INVALIDATE_CHANNEL, b"stocks")
+    except Exception as e:
+        logger.warning(f"Redis invalidate failed: {e}")
+
+
+async def listen_for_invalidations(on_invalidate):
+    """Call on_invalidate() for every message on INVALIDATE_CHANNEL, reconnecting on errors."""
+    r = get_redis()
+    if r is None:
+        return
+    while True:
+        try:
+            async with r.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        on_invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Redis subscriber error, retrying: {e}")
+            await asyncio.sleep(5)
@@ -1,26 +1,82 @@
 import asyncio
 import logging
+import math
+import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from datetime import datetime
 from sqlalchemy import select, delete
 from database import AsyncSessionLocal
 from models import StockData, TurkishGold, ExchangeRate, AIInsight
+from analysis import BIST_SYMBOLS, GLOBAL_SYMBOLS, COMMODITIES_SYMBOLS
+from ai_service import get_market_insight
+from data_sources.global_market import fetch_commodity_data, fetch_global_stock, fetch_stocks_batch
+from data_sources.turkish_market import (
+    fetch_bist_stock, fetch_bist_stock_fallback, fetch_bist_stocks_batch,
+    fetch_exchange_rates, fetch_turkish_gold,
+)
+from data_sources.yahoo_chart import fetch_chart_quotes
+from shared_cache import invalidate_market_data
+from api_router import get_async_router, KEYED_PROVIDERS
 
 logger = logging.getLogger(__name__)
 
-# Import will be done lazily to avoid circular imports
-_refresh_running = False
+# Held for the whole refresh; a non-blocking acquire is the atomic "start
+# unless already running" check. Every refresh (periodic or manual) runs on
+# the app's event loop, which the shared HTTP and Redis clients are bound to.
+_refresh_lock = threading.Lock()
 _last_refresh_time = 0
 
+# Concurrent per-symbol fetches in each refresh phase. yfinance Ticker calls
+# are I/O-bound and thread-safe; keep this modest to stay under Yahoo's limits.
+REFRESH_WORKERS = int(os.getenv('REFRESH_WORKERS', '16'))
+SYMBOL_TIMEOUT = 15  # seconds each symbol's fetch is allowed in a phase
+# Time budget for the API-router tier (keyed providers only) in each refresh
+ROUTER_BUDGET = 20
+
+def last_refresh_time() -> float:
+    """Epoch seconds of the last completed refresh (0 before the first)"""
+    return _last_refresh_time
+
+def _fetch_concurrently(fetch, symbols) -> dict:
+    """Run fetch(symbol) for all symbols on a thread pool; returns {symbol: data} for hits"""
+    results = {}
+    if not symbols:
+        return results
+    
+    workers = max(1, min(REFRESH_WORKERS, len(symbols)))
+    # SYMBOL_TIMEOUT per symbol, `workers` at a time
+    budget = SYMBOL_TIMEOUT * math.ceil(len(symbols) / workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    try:
+        futures = {executor.submit(fetch, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures, timeout=budget):
+            symbol = futures[future]
+            try:
+                data = future.result()
+                if data:
+                    results[symbol] = data
+            except Exception as e:
+                logger.error(f"Fetch error {symbol}: {e}")
+    except FuturesTimeout:
+        dropped = sum(not f.done() for f in futures)
+        logger.warning(f"Fetch budget of {budget}s ran out: dropped {dropped}/{len(symbols)} symbols")
+    finally:
+        # Drop queued fetches, but let running ones finish so they don't
+        # overlap the next tier's requests
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
 async def refresh_all_data():
     """Master refresh function — called every 10 minutes or on manual refresh"""
-    global _refresh_running, _last_refresh_time
+    global _last_refresh_time
     
-    if _refresh_running:
+    if not _refresh_lock.acquire(blocking=False):
         logger.info("Refresh already in progress, skipping...")
         return False
     
-    _refresh_running = True
     logger.info("🔄 Starting full data refresh...")
     start_time = time.time()
     
@@ -48,6 +104,9 @@ async def refresh_all_data():
         
         elapsed = time.time() - start_time
         _last_refresh_time = time.time()
+        
+        # Other workers' cached market snapshots are now stale
+        await invalidate_market_data()
         logger.info(f"✅ Full refresh complete in {elapsed:.1f}s")
         return True
         
@@ -55,24 +114,38 @@ async def refresh_all_data():
         logger.error(f"Full refresh error: {e}")
         return False
     finally:
-        _refresh_running = False
+        _refresh_lock.release()
 
 async def refresh_bist_stocks() -> int:
     """Refresh all BIST stocks"""
-    from analysis import BIST_SYMBOLS
-    from data_sources.turkish_market import fetch_bist_stock, fetch_bist_stock_fallback
+    # One batched download for stocks we already have, async chart quotes for
+    # any the batch missed; per-symbol primary source, then fallback, for new
+    # symbols and whatever is still missing; the API router's keyed providers
+    # as the last resort for stored symbols
+    known = await _known_symbols()
+    stored = [s for s in BIST_SYMBOLS if s.replace('.IS', '') in known]
+    fetched = await asyncio.to_thread(fetch_bist_stocks_batch, stored)
+    fetched.update({
+        s: {**q, 'symbol': s.replace('.IS', '')}
+        for s, q in (await fetch_chart_quotes([s for s in stored if s not in fetched])).items()
+    })
+    fetched.update(await asyncio.to_thread(
+        _fetch_concurrently,
+        lambda s: fetch_bist_stock(s) or fetch_bist_stock_fallback(s),
+        [s for s in BIST_SYMBOLS if s not in fetched],
+    ))
+    fetched.update({
+        s: {**q, 'symbol': s.replace('.IS', '')}
+        for s, q in (await _fetch_via_router([s for s in stored if s not in fetched])).items()
+    })
     
     count = 0
     async with AsyncSessionLocal() as session:
         for symbol in BIST_SYMBOLS:
+            data = fetched.get(symbol)
+            if not data:
+                continue
             try:
-                # Try primary source
-                data = await asyncio.to_thread(fetch_bist_stock, symbol)
-                if not data:
-                    data = await asyncio.to_thread(fetch_bist_stock_fallback, symbol)
-                if not data:
-                    continue
-                
                 # Add analysis fields
                 data = _enrich_stock_data(data, market_type='BIST', currency='TRY')
                 
@@ -80,9 +153,6 @@ async def refresh_bist_stocks() -> int:
                 await _upsert_stock(session, data)
                 count += 1
                 
-                # Small delay to avoid rate limits
-                await asyncio.sleep(0.3)
-                
             except Exception as e:
                 logger.error(f"BIST refresh error {symbol}: {e}")
         
@@ -91,23 +161,29 @@ async def refresh_bist_stocks() -> int:
 
 async def refresh_global_stocks() -> int:
     """Refresh all global stocks"""
-    from analysis import GLOBAL_SYMBOLS
-    from data_sources.global_market import fetch_global_stock
+    # Batch (then async chart) quotes keep the stored name/market cap; new
+    # symbols need the full fetch; the API router's keyed providers cover
+    # stored symbols that are still missing
+    known = await _known_symbols()
+    stored = [s for s in GLOBAL_SYMBOLS if s in known]
+    fetched = await asyncio.to_thread(fetch_stocks_batch, stored)
+    fetched.update(await fetch_chart_quotes([s for s in stored if s not in fetched]))
+    fetched.update(await asyncio.to_thread(
+        _fetch_concurrently, fetch_global_stock, [s for s in GLOBAL_SYMBOLS if s not in fetched]
+    ))
+    fetched.update(await _fetch_via_router([s for s in stored if s not in fetched]))
     
     count = 0
     async with AsyncSessionLocal() as session:
         for symbol in GLOBAL_SYMBOLS:
+            data = fetched.get(symbol)
+            if not data:
+                continue
             try:
-                data = await asyncio.to_thread(fetch_global_stock, symbol)
-                if not data:
-                    continue
-                
                 data = _enrich_stock_data(data, market_type='GLOBAL', currency=data.get('currency', 'USD') or 'USD')
                 await _upsert_stock(session, data)
                 count += 1
                 
-                await asyncio.sleep(0.3)
-                
             except Exception as e:
                 logger.error(f"Global refresh error {symbol}: {e}")
         
@@ -116,17 +192,18 @@ async def refresh_global_stocks() -> int:
 
 async def refresh_commodities() -> int:
     """Refresh commodities"""
-    from analysis import COMMODITIES_SYMBOLS
-    from data_sources.global_market import fetch_commodity_data
+    fetched = await fetch_chart_quotes(list(COMMODITIES_SYMBOLS))
+    fetched.update(await asyncio.to_thread(
+        _fetch_concurrently, fetch_commodity_data, [s for s in COMMODITIES_SYMBOLS if s not in fetched]
+    ))
     
     count = 0
     async with AsyncSessionLocal() as session:
         for symbol, name in COMMODITIES_SYMBOLS.items():
+            data = fetched.get(symbol)
+            if not data:
+                continue
             try:
-                data = await asyncio.to_thread(fetch_commodity_data, symbol)
-                if not data:
-                    continue
-                
                 data['name'] = name
                 data = _enrich_stock_data(data, market_type='COMMODITY', currency='USD')
                 await _upsert_stock(session, data)
@@ -140,8 +217,6 @@ async def refresh_commodities() -> int:
 
 async def refresh_turkish_gold() -> int:
     """Refresh Turkish gold prices"""
-    from data_sources.turkish_market import fetch_turkish_gold
-    
     try:
         gold_data = await asyncio.to_thread(fetch_turkish_gold)
         if not gold_data:
@@ -171,8 +246,6 @@ async def refresh_turkish_gold() -> int:
 
 async def refresh_exchange_rates() -> int:
     """Refresh exchange rates"""
-    from data_sources.turkish_market import fetch_exchange_rates
-    
     try:
         rates = await asyncio.to_thread(fetch_exchange_rates)
         if not rates:
@@ -225,7 +298,6 @@ async def refresh_ai_insight() -> bool:
                 'previous_close': s.previous_close
             } for s in stocks]
             
-            from ai_service import get_market_insight
             insight_text = await asyncio.to_thread(get_market_insight, market_data)
             
             # Save to DB
@@ -289,6 +361,38 @@ def _enrich_stock_data(data: dict, market_type: str, currency: str) -> dict:
     
     return data
 
+async def _fetch_via_router(symbols) -> dict:
+    """
+    Last-resort quotes from the API router's keyed providers (Finnhub, Polygon,
+    Alpha Vantage), mapped to the price-only quote shape. Only pass symbols
+    that already have a stored row: this shape has no name or market cap.
+    Its limiters keep this within quota, and ROUTER_BUDGET bounds the time.
+    """
+    if not symbols:
+        return {}
+    quotes = await get_async_router().fetch_prices(symbols, providers=KEYED_PROVIDERS, timeout=ROUTER_BUDGET)
+    return {
+        symbol: {
+            'symbol': symbol,
+            'price': q['price'],
+            'change_pct': q.get('change_pct', 0),
+            'volume': q.get('volume', 0),
+            'day_high': q.get('day_high') or q.get('high') or 0,
+            'day_low': q.get('day_low') or q.get('low') or 0,
+            'open': q.get('open') or 0,
+            'previous_close': q.get('previous_close') or q.get('prev_close') or 0,
+            'bid': 0.0,
+            'ask': 0.0,
+        }
+        for symbol, q in quotes.items() if q.get('price')
+    }
+
+async def _known_symbols() -> set:
+    """Symbols that already have a stored row (and so a name and market cap)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(StockData.symbol))
+        return set(result.scalars().all())
+
 async def _upsert_stock(session, data: dict):
     """Insert or update a stock record"""
     result = await session.execute(
@@ -0,0 +1,32 @@
+"""
+Shared HTTP session for every yfinance call.
+Reusing one session keeps TLS connections and Yahoo's cookie/crumb alive
+across tickers instead of renegotiating them per call.
+"""
+
+# Sized above REFRESH_WORKERS so parallel fetches never queue on pool checkout
+POOL_SIZE = 64
+
+try:
+    # Same backend yfinance picks by default: browser TLS impersonation.
+    # Its sync Session keeps one curl handle per thread, so there is no
+    # shared pool for worker threads to serialize on.
+    from curl_cffi import requests as _backend
+    SESSION = _backend.Session(impersonate="chrome")
+except ImportError:
+    import requests as _backend
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    SESSION = _backend.Session()
+    SESSION.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    })
+    # urllib3 defaults to 10 connections per host, well below our fan-out
+    SESSION.mount("https://", HTTPAdapter(
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        pool_block=False,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+    ))
@@ -20,8 +20,9 @@ async function loadChart(symbol, period) {
         if (!res.ok) throw new Error('Chart data unavailable');
         const data = await res.json();
         
-        const history = data.history || [];
-        if (history.length === 0) throw new Error('No data points');
+        // Columnar arrays: {time: [...], open: [...], high: [...], low: [...], close: [...]}
+        const history = data.history || {};
+        if (!(history.time || []).length) throw new Error('No data points');
         
         renderCandlestickChart(history);
     } catch(e) {
@@ -31,11 +32,7 @@ async function loadChart(symbol, period) {
 }
 
 function renderCandlestickChart(history) {
-    const dates = history.map(d => d.time);
-    const opens = history.map(d => d.open);
-    const highs = history.map(d => d.high);
-    const lows = history.map(d => d.low);
-    const closes = history.map(d => d.close);
+    const { time: dates, open: opens, high: highs, low: lows, close: closes } = history;
     
     // Check if we have valid OHLC data
     const hasOHLC = opens.some(v => v && v > 0) && highs.some(v => v && v > 0);